@@ -5,19 +5,34 @@ import getopt
 import optparse
 import os
 import sys
+import time
 import traceback
 
 import game_state
 import game_player
 import game_controller
+import game_perft
+import game_book
+import game_pns
+import game_solver
 
 MAX_EXPAND = 15
+BOOK_DEPTH = 8
+PROOF_NODES = 10**6
 USAGE_STRING = \
-"\nUsage 1: %prog [-m | -a] [-e MAX_EXPAND] GAME PLAYER1 PLAYER2\n"\
-"Usage 2: %prog -t [-v] [-e MAX_EXPAND] [-x PLAYER] GAME\n\n"\
+"\nUsage 1: %prog [-m | -a] [-e MAX_EXPAND] [TIME] [--ponder]\n"\
+	"\tGAME PLAYER1 PLAYER2\n"\
+"Usage 2: %prog -t [-v] [-e MAX_EXPAND] [TIME] [--ponder] [-x PLAYER]\n"\
+	"\tGAME\n"\
+"Usage 3: %prog --perft DEPTH GAME [POSITION]\n"\
+"Usage 4: %prog --book PLIES [--book-depth DEPTH] [--processes N]\n"\
+	"\tGAME PLAYER\n"\
+"Usage 5: %prog --prove [--nodes N] GAME [POSITION]\n\n"\
 "GAME specifies the game to be played (see README)\n"\
 "PLAYER1, PLAYER2 specify player modules to use for first and second player\n"\
-	"\trespectively"
+	"\trespectively\n"\
+"TIME is an optional time control: --move-time SECONDS, or\n"\
+	"\t--clock SECONDS [--increment SECONDS]"
 PLAYER_PATH = './players'
 GAME_SUFFIX = "State"
 PLAYER_SUFFIX = "Player"
@@ -91,9 +106,15 @@ def class_instance(mod, name, *args):
 # "maxExpansions" is the maximum number of game-tree expansions to allow each
 # player as they search during one turn.
 #
-# "alphabeta" is a boolean indicating whether alpha-beta is used or not.
-def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
-		p2alphabeta):
+# "p1Search", "p2Search" say which of each player's move functions to use:
+# GameController.MINIMAX, ALPHA_BETA or TOURN.
+#
+# "timeControl" is a (move_time, clock, increment) tuple of arguments for the
+# GameController (see its constructor).
+#
+# "ponder" is True to let players think on each other's time.
+def play_game(gameName, p1Name, p2Name, maxExpansions, p1Search, \
+		p2Search, timeControl=(None, None, 0), ponder=False):
 	wd = os.getcwd()
 	# Load game, player modules
 	gameMod = load_module(gameName.lower(), None, wd)
@@ -112,15 +133,12 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 	if p1 == None or p2 == None:
 		sys.exit(2)
 		
-	fn1 = game_controller.GameController.ALPHA_BETA if p1alphabeta \
-				else game_controller.GameController.MINIMAX
-	fn2 = game_controller.GameController.ALPHA_BETA if p2alphabeta \
-				else game_controller.GameController.MINIMAX
-	
 	# Create a game controller
 	try:
-		gm = game_controller.GameController(state, [p1,p2], [fn1,fn2],
-											maxExpansions, wd)
+		gm = game_controller.GameController(state, [p1,p2], \
+											[p1Search,p2Search],
+											maxExpansions, wd, *timeControl, \
+											ponder=ponder)
 	except game_controller.PlayerException, e:
 		print "Player ID not covered!"
 		print e
@@ -167,7 +185,10 @@ def play_game(gameName, p1Name, p2Name, maxExpansions, p1alphabeta, \
 #
 # "quiet" indicates that the program should refrain from outputting each and
 # every game state as games are played, if True.
-def play_tournament(gameName, exclusions, maxExpansions, quiet):
+#
+# "timeControl" and "ponder" are as for play_game() above.
+def play_tournament(gameName, exclusions, maxExpansions, quiet, \
+		timeControl=(None, None, 0), ponder=False):
 	wd = os.getcwd()
 	
 	# Load game module
@@ -216,7 +237,7 @@ def play_tournament(gameName, exclusions, maxExpansions, quiet):
 		gm = game_controller.GameController(state, \
 					[players[0][0],players[1][1]], \
 					playerFns, \
-					maxExpansions, wd)
+					maxExpansions, wd, *timeControl, ponder=ponder)
 	except game_controller.PlayerException, e:
 		print "Player ID not covered!"
 		print e
@@ -260,6 +281,125 @@ def play_tournament(gameName, exclusions, maxExpansions, quiet):
 	
 
 
+# Runs the move-generation benchmark (see game_perft.py) for the indicated game
+# to the indicated depth.
+#
+# "gameName" is as for play_game() above.
+#
+# "position" is a position string (see GameState.position_string()) to start
+# from, or None to start from the beginning of the game.  Leaf counts from the
+# start are checked against game_perft.REFERENCE_COUNTS.
+#
+# Returns True if no leaf count mismatched the reference, False else.
+def play_perft(gameName, depth, position):
+	wd = os.getcwd()
+	
+	# Load game module
+	gameMod = load_module(gameName.lower(), None, wd)
+	if gameMod == None:
+		sys.exit(2)
+	
+	# Instantiate game class
+	state = class_instance(gameMod, gameName+GAME_SUFFIX)
+	if state == None:
+		sys.exit(2)
+	
+	reference = None
+	if position == None:
+		reference = game_perft.REFERENCE_COUNTS.get(gameName)
+	else:
+		try:
+			state.load_position(position)
+		except ValueError, e:
+			print "Error:", e
+			sys.exit(1)
+	
+	print "\nPerft for", gameName, "from:\n"
+	print state
+	print "\n(repeated-state detection is off during perft)\n"
+	return game_perft.run_perft(state, depth, reference)
+
+
+# Builds an opening book (see game_book.py) for the indicated game, with the
+# indicated player's evaluation function, and saves it where that game's
+# players look for it (players/<game>/book.dat).
+#
+# "gameName" is as for play_game() above; "playerName" is a player module as
+# for play_game()'s "p1Name".
+#
+# "plies" is how many plies into the game the book goes, "depth" how deep each
+# position in it is searched, and "processes" the number of processes to
+# search with (None for one per core).
+def play_book(gameName, playerName, plies, depth, processes):
+	wd = os.getcwd()
+	
+	# Load game, player modules
+	gameMod = load_module(gameName.lower(), None, wd)
+	playerMod = load_module(playerName, \
+					os.path.join(PLAYER_PATH, gameName.lower()), wd)
+	if gameMod == None or playerMod == None:
+		sys.exit(2)
+	
+	# Instantiate game, player classes
+	state = class_instance(gameMod, gameName+GAME_SUFFIX)
+	if state == None:
+		sys.exit(2)
+	player = class_instance(playerMod, gameName+PLAYER_SUFFIX, playerName, \
+					state.get_players()[0])
+	if player == None:
+		sys.exit(2)
+	
+	path = os.path.join(PLAYER_PATH, gameName.lower())
+	fname = os.path.join(path, game_book.FILE)
+	print "\nBuilding a %d-ply opening book for %s with %s\n" \
+			% (plies, gameName, playerName)
+	game_book.build_book(state, plies, depth, \
+			(path, playerName, gameName+PLAYER_SUFFIX), fname, processes)
+
+
+# Tries to prove the result of the indicated game (see game_pns.py) with
+# proof-number search, and prints it.
+#
+# "gameName" and "position" are as for play_perft() above; "nodes" is the
+# most positions the search may expand.
+def play_prove(gameName, position, nodes):
+	wd = os.getcwd()
+	
+	# Load game module
+	gameMod = load_module(gameName.lower(), None, wd)
+	if gameMod == None:
+		sys.exit(2)
+	
+	# Instantiate game class
+	state = class_instance(gameMod, gameName+GAME_SUFFIX)
+	if state == None:
+		sys.exit(2)
+	if position != None:
+		try:
+			state.load_position(position)
+		except ValueError, e:
+			print "Error:", e
+			sys.exit(1)
+	
+	print "\nProving", gameName, "from:\n"
+	print state
+	print
+	search = game_pns.ProofNumberSearch(nodes)
+	start = time.time()
+	result, move = search.solve(state)
+	elapsed = time.time() - start
+	if result == None:
+		print "Unknown: gave up"
+	else:
+		print {game_solver.GameSolver.WIN: "Win", \
+				game_solver.GameSolver.DRAW: "Draw", \
+				game_solver.GameSolver.LOSS: "Loss"}[result], \
+				"for player", state.get_next_player()
+		if move != None:
+			print "by:", move
+	print "%d positions expanded in %.2f seconds" % (search.nodes, elapsed)
+
+
 def main():
 	parser = optparse.OptionParser()
 	gameName = None
@@ -280,6 +420,10 @@ def main():
 		help="Have player 2 use minimax tree search (default).")
 	parser.add_option("--a2", "--alpha-beta2", action="store_true", dest="alphabeta2",
 		help="Have player 2 use alpha-beta tree search.")
+	parser.add_option("--t1", "--tournament1", action="store_true",
+		dest="tournament1", help="Have player 1 use its tournament search.")
+	parser.add_option("--t2", "--tournament2", action="store_true",
+		dest="tournament2", help="Have player 2 use its tournament search.")
 	parser.add_option("-t", "--tournament", action="store_true", dest="tournament",
 		help="Run a tournament with all compatible players.")
 	parser.add_option("-e", "--max-expand", type="int", dest="maxExpand",
@@ -290,37 +434,134 @@ def main():
 		"to exclude many players.", metavar="PLAYER")
 	parser.add_option("-v", "--verbose", action="store_false", dest="quiet",
 		help="Print out all the game states in tournament mode.")
+	parser.add_option("--move-time", type="float", dest="moveTime",
+		help="Allow each player SECONDS to think per move (default: no "\
+		"limit).", metavar="SECONDS")
+	parser.add_option("--clock", type="float", dest="clock",
+		help="Give each player a clock with SECONDS for the whole game "\
+		"(default: no limit).", metavar="SECONDS")
+	parser.add_option("--increment", type="float", dest="increment",
+		help="Add SECONDS to a player's clock after each move (default=0).",
+		metavar="SECONDS")
+	parser.add_option("--ponder", action="store_true", dest="ponder",
+		help="Let players think on each other's time.")
+	parser.add_option("--perft", type="int", dest="perft",
+		help="Count the positions DEPTH plies deep from the start (or from "\
+		"POSITION) to benchmark and check the game's move generation.",
+		metavar="DEPTH")
+	parser.add_option("--book", type="int", dest="book",
+		help="Build an opening book of the first PLIES plies with PLAYER's "\
+		"evaluation function.", metavar="PLIES")
+	parser.add_option("--book-depth", type="int", dest="bookDepth",
+		help="Search each position of the opening book DEPTH plies deep "\
+		"(default=%d)." % BOOK_DEPTH, metavar="DEPTH")
+	parser.add_option("--processes", type="int", dest="processes",
+		help="Build the opening book with N processes (default: one per "\
+		"core).", metavar="N")
+	parser.add_option("--prove", action="store_true", dest="prove",
+		help="Try to prove the game won, drawn or lost for the player to "\
+		"move from the start (or from POSITION).")
+	parser.add_option("--nodes", type="int", dest="nodes",
+		help="Let --prove expand up to N positions (default=%d)." \
+		% PROOF_NODES, metavar="N")
 	parser.set_defaults(alphabeta=False, minimax=False, tournament=False,
-		maxExpand=MAX_EXPAND, exclusions=[], quiet=True)
+		maxExpand=MAX_EXPAND, exclusions=[], quiet=True, perft=None,
+		moveTime=None, clock=None, increment=0, ponder=False, book=None,
+		bookDepth=BOOK_DEPTH, processes=None, prove=False,
+		nodes=PROOF_NODES)
 	
 	# Parse the arguments
 	opts, args = parser.parse_args()
 	
-	# Using alpha-beta?
-	p1alphabeta = False
-	p2alphabeta = False
+	# Using alpha-beta, or the players' tournament searches?
+	p1Search = game_controller.GameController.MINIMAX
+	p2Search = game_controller.GameController.MINIMAX
 	# Why on earth doesn't optparse handle store_false and store_true to
 	#  the same option as mutually exclusive?
-	if opts.minimax1 and opts.alphabeta1:
-		print "Error: --alpha-beta1 and --minimax1 are mutually exclusive."
+	if [opts.minimax1, opts.alphabeta1, opts.tournament1].count(True) > 1:
+		print "Error: --alpha-beta1, --minimax1 and --tournament1 are "\
+				"mutually exclusive."
 		sys.exit(1)
-	if opts.minimax2 and opts.alphabeta2:
-		print "Error: --alpha-beta2 and --minimax2 are mutually exclusive."
+	if [opts.minimax2, opts.alphabeta2, opts.tournament2].count(True) > 1:
+		print "Error: --alpha-beta2, --minimax2 and --tournament2 are "\
+				"mutually exclusive."
 		sys.exit(1)
 	if opts.alphabeta1:
-		p1alphabeta = True
+		p1Search = game_controller.GameController.ALPHA_BETA
 	if opts.alphabeta2:
-		p2alphabeta = True
+		p2Search = game_controller.GameController.ALPHA_BETA
+	if opts.tournament1:
+		p1Search = game_controller.GameController.TOURN
+	if opts.tournament2:
+		p2Search = game_controller.GameController.TOURN
+	
+	# Time controls
+	if opts.moveTime != None and opts.clock != None:
+		print "Error: --move-time and --clock are mutually exclusive."
+		sys.exit(1)
+	if opts.increment != 0 and opts.clock == None:
+		print "Error: --increment requires --clock."
+		sys.exit(1)
+	if opts.ponder and (opts.moveTime != None or opts.clock != None):
+		print "Error: --ponder can't be used with --move-time or --clock."
+		sys.exit(1)
+	timeControl = (opts.moveTime, opts.clock, opts.increment)
+	
+	# Benchmarking move generation
+	if opts.perft != None:
+		if len(args) != 1 and len(args) != 2:
+			print "Error: Perft requires 1 or 2 arguments.  "\
+					"Use '-h' for more information."
+			sys.exit(1)
+		
+		if opts.tournament:
+			print "Error: --perft and --tournament are mutually exclusive."
+			sys.exit(1)
+		
+		# Get the game name and maybe the starting position
+		gameName = args[0]
+		position = args[1] if len(args) == 2 else None
+		
+		# Count, and exit with an error if the counts are off
+		if not play_perft(gameName, opts.perft, position):
+			sys.exit(4)
+	
+	# Building an opening book
+	elif opts.book != None:
+		if len(args) != 2:
+			print "Error: Building a book requires 2 arguments.  "\
+					"Use '-h' for more information."
+			sys.exit(1)
+		
+		if opts.tournament:
+			print "Error: --book and --tournament are mutually exclusive."
+			sys.exit(1)
+		
+		play_book(args[0], args[1], opts.book, opts.bookDepth, opts.processes)
+	
+	# Proving a position
+	elif opts.prove:
+		if len(args) != 1 and len(args) != 2:
+			print "Error: Proving requires 1 or 2 arguments.  "\
+					"Use '-h' for more information."
+			sys.exit(1)
+		
+		if opts.tournament:
+			print "Error: --prove and --tournament are mutually exclusive."
+			sys.exit(1)
+		
+		play_prove(args[0], args[1] if len(args) == 2 else None, opts.nodes)
 	
 	# Playing a tournament
-	if opts.tournament:
+	elif opts.tournament:
 		if len(args) != 1:
 			print "Error: Tournament requires 1 argument.  "\
 					"Use '-h' for more information."
 			sys.exit(1)
 		
 		# Minimax, alpha-beta options meaningless to tournament play
-		if opts.minimax1 or opts.alphabeta1 or opts.minimax2 or opts.alphabeta2:
+		if opts.minimax1 or opts.alphabeta1 or opts.tournament1 \
+				or opts.minimax2 or opts.alphabeta2 or opts.tournament2:
 			print "Error: Minimax and alpha-beta specifications are "\
 					"compatible only with non-tournament play.  Use '-h' "\
 					"for more information."
@@ -330,7 +571,8 @@ def main():
 		gameName = args[0]
 		
 		# Run the tournament
-		play_tournament(gameName, opts.exclusions, opts.maxExpand, opts.quiet)
+		play_tournament(gameName, opts.exclusions, opts.maxExpand, opts.quiet,
+			timeControl, opts.ponder)
 		
 	# Just playing one player against another
 	else:
@@ -355,7 +597,8 @@ def main():
 			"using", "alpha-beta" if alphabeta else "minimax", "planning.\n"
 		
 		# Go ahead and play
-		play_game(gameName, p1Name, p2Name, opts.maxExpand, p1alphabeta, p2alphabeta)
+		play_game(gameName, p1Name, p2Name, opts.maxExpand, p1Search, p2Search,
+			timeControl, opts.ponder)
 
 if __name__ == "__main__":
 	main()
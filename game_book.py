@@ -0,0 +1,224 @@
+import bisect
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+
+import game_ordering
+import game_search
+import game_table
+
+# Opening books: the best move and its value for every position in the first
+# few plies of a game, found by deep searches ahead of time, so that a player
+# can answer those positions at once and save its expansions for later.
+#
+# build_book() searches every position reachable from the start in fewer than
+# a given number of plies, each as deep as asked, sharing them out over
+# worker processes (one per core by default).  Positions equivalent by a
+# symmetry of the game (see GameState.canonical_key()) share one record, from
+# searching whichever of them is found first.  Each result is one fixed-size
+# record, (hash key, move, value), and the records are written to a file
+# sorted by hash key:
+#   the hash key is the canonical position's GameState.hash_key(), which is
+#     the canonical key of every position equivalent to it
+#   the move is the index of the best move in the list successor_moves()
+#     gives for the canonical position
+#   the value is from the point of view of the player to move, in the units
+#     of the evaluation function the book was built with
+#
+# OpeningBook reads a book through a memory map and finds positions in it by
+# binary search.  Any player can consult one before searching: see
+# OpeningBook.move().  (game.py --book builds books with a player's
+# evaluation function.)
+#
+# Books are only as good as the hash keys are unique, which for 64-bit
+# Zobrist keys is very good; a book move which isn't legal in the position is
+# never returned.  Repeated positions aren't considered: openings are too
+# short to cycle.
+
+# Start of a book file
+MAGIC = "GAME-BOOK\n"
+# One record: hash key, move index, value
+RECORD = struct.Struct("<QBd")
+# Where players look for their game's book (see OpeningBook.load())
+FILE = "book.dat"
+
+# The search each worker process uses: a (state, evaluate, depth) tuple set
+# by start_worker() when the process starts
+builder = None
+
+# Returns a list of the position strings (see GameState.position_string()) of
+# the positions reachable from "state" in fewer than "plies" plies where the
+# game isn't over, one for each set of equivalent positions.  "state" should
+# have no controller.
+def book_positions(state, plies):
+	found = set()
+	positions = []
+	level = [state.make_copy()]
+	for ply in range(plies):
+		following = []
+		for position in level:
+			key = position.canonical_key()[0]
+			over, winner = position.terminal_status()
+			if key in found or over:
+				continue
+			found.add(key)
+			positions.append(position.position_string())
+			for move in position.successor_moves():
+				following.append(position.move_copy(move)[1])
+		level = following
+	return positions
+
+# Sets up a worker process for build_book(): makes a state of the class
+# "game", and a player from the module "module" in the directory "path"
+# ("cls" being its class), and sets "builder" to search "depth" plies deep
+# with the player's evaluation function.
+#
+# Every worker sets itself up from these picklable arguments, rather than
+# inheriting "builder" from the parent, so that books can also be built where
+# worker processes start afresh instead of being forked (as on Windows).
+def start_worker(game, path, module, cls, depth):
+	global builder
+	if path not in sys.path:
+		sys.path.append(path)
+	state = game()
+	player = getattr(__import__(module), cls)(module, state.get_players()[0])
+	builder = (state, player.evaluate, depth)
+
+# Searches the position "text" (a position string) as "builder" says, and
+# returns its record: a (hash key, move index, value) tuple
+def search_position(text):
+	prototype, evaluate, depth = builder
+	state = prototype.make_copy()
+	state.load_position(text)
+	search = game_search.GameSearch(evaluate, \
+			game_table.TranspositionTable(2**18), game_ordering.MoveOrdering())
+	value, move = search.iterative_deepening(state, depth, \
+			game_search.GameSearch.PVS)
+	key, symmetry = state.canonical_key()
+	image = state.transformed(symmetry)
+	return (key, image.successor_moves().index( \
+			state.transform_move(move, symmetry)), value)
+
+# Builds a book for the game "state" is the start of (it should have no
+# controller), of every position fewer than "plies" plies in, each searched
+# "depth" plies deep with the evaluation function of the player "player", and
+# writes it to the file "fname".
+#
+# "player" is a (directory, module name, class name) tuple: each worker
+# process loads the module from the directory and creates the player itself
+# (see start_worker()).  "state" must be of a class the workers can import
+# by name too.
+#
+# "processes" is the number of worker processes to search with, or None for
+# one per core.  Reports progress on "out".
+def build_book(state, plies, depth, player, fname, processes=None, \
+		out=sys.stdout):
+	positions = book_positions(state, plies)
+	out.write("Searching %d positions %d plies deep\n" \
+			% (len(positions), depth))
+	start = time.time()
+	pool = multiprocessing.Pool(processes, start_worker, \
+			(type(state),) + tuple(player) + (depth,))
+	try:
+		records = []
+		for record in pool.imap_unordered(search_position, positions):
+			records.append(record)
+			if len(records) % 100 == 0:
+				out.write("%d done, %.1f seconds\n" \
+						% (len(records), time.time() - start))
+		pool.close()
+	except:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+	records.sort()
+	fout = open(fname, 'wb')
+	fout.write(MAGIC)
+	for record in records:
+		fout.write(RECORD.pack(*record))
+	fout.close()
+	out.write("Wrote %d positions to %s in %.1f seconds\n" \
+			% (len(records), fname, time.time() - start))
+
+
+# A book built by build_book(), read through a memory map.
+class OpeningBook(object):
+	# "fname" is the file to open
+	def __init__(self, fname):
+		fin = open(fname, 'rb')
+		try:
+			self.data = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+		finally:
+			fin.close()
+		if self.data[:len(MAGIC)] != MAGIC \
+				or (len(self.data) - len(MAGIC)) % RECORD.size != 0:
+			raise ValueError("%s is not an opening book" % fname)
+		# Number of positions in the book
+		self.size = (len(self.data) - len(MAGIC)) / RECORD.size
+		# Lookup statistics
+		self.probes = 0
+		self.hits = 0
+	
+	# Opens the book file "fname" in the directory of the players of the game
+	# "game" (e.g., "oware"), or returns None if there isn't one.
+	#
+	# Follows the convention for player files: the working directory is
+	# restored afterward.
+	@classmethod
+	def load(cls, game, fname=FILE):
+		wd = os.getcwd()
+		os.chdir(os.path.join("players", game))
+		try:
+			if not os.path.exists(fname):
+				return None
+			return cls(fname)
+		finally:
+			os.chdir(wd)
+	
+	# Returns the record at position "i" in the file
+	def record(self, i):
+		offset = len(MAGIC) + i * RECORD.size
+		return RECORD.unpack(self.data[offset:offset + RECORD.size])
+	
+	# Lets bisect search the records by hash key
+	def __len__(self):
+		return self.size
+	def __getitem__(self, i):
+		return self.record(i)[0]
+	
+	# Returns the (move, value) the book has for "state", or None if the book
+	# doesn't have the position.  Doesn't count as an expansion.
+	def lookup(self, state):
+		self.probes += 1
+		key, symmetry = state.canonical_key()
+		if key == None:
+			return None
+		i = bisect.bisect_left(self, key)
+		if i == self.size:
+			return None
+		found, index, value = self.record(i)
+		if found != key:
+			return None
+		image = state.transformed(symmetry)
+		image.setController(None, False)
+		moves = image.successor_moves()
+		if index >= len(moves):
+			return None
+		self.hits += 1
+		return (state.untransform_move(moves[index], symmetry), value)
+	
+	# Returns the book move for "state", or None if the book doesn't have the
+	# position
+	def move(self, state):
+		found = self.lookup(state)
+		if found == None:
+			return None
+		return found[0]
+	
+	# Releases the memory map
+	def close(self):
+		self.data.close()
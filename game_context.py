@@ -0,0 +1,92 @@
+import time
+
+# A search context for one player's turn.
+#
+# At the start of each turn the GameController creates one of these and
+# attaches it to the copy of the game state it hands to the player, in place of
+# the controller itself.  Every state the player derives from that copy carries
+# the same context, so counting expansions is a plain method call on a small
+# local object rather than a call back into the controller through a weakref
+# proxy, and the states a player searches don't reference the controller at
+# all (which means they can be pickled and searched in another process).
+#
+# The context enforces the turn's expansion limit exactly as the controller
+# used to: successor_generated() is refused once "max_expansions" expansions
+# have been made.
+#
+# If the game is played under a time control, the context also carries the
+# time (as from time.time()) by which the player should have chosen a move.
+# Nothing stops a player from taking longer, but the controller may then rule
+# that the player has lost on time.
+#
+# It also carries the controller's game epoch (see
+# GameController.get_epoch()), so a player can tell whether what it learned
+# on earlier turns still applies, and a snapshot of the game's repeated-state
+# history, so that searches can tell which lines would cycle.
+class SearchContext(object):
+	__slots__ = ('expansions', 'deadline', 'epoch', 'history', 'stopped')
+	
+	# "max_expansions" is the number of expansions allowed this turn
+	# "deadline" is the time the player should move by, or None for no limit
+	# "epoch" is the controller's game epoch, or None
+	# "history" is a frozenset of the repeated_rep() values of the positions
+	#   played since the repeated-state history was last cleared, or None
+	def __init__(self, max_expansions, deadline=None, epoch=None, \
+			history=None):
+		# Expansions left to hand out
+		self.expansions = max_expansions
+		self.deadline = deadline
+		self.epoch = epoch
+		self.history = history
+		# True once stop() has been called
+		self.stopped = False
+	
+	# Slotted objects need these to be pickled with the default protocol
+	def __getstate__(self):
+		return (self.expansions, self.deadline, self.epoch, self.history, \
+				self.stopped)
+	def __setstate__(self, state):
+		self.expansions, self.deadline, self.epoch, self.history, \
+				self.stopped = state
+	
+	# Returns the controller's game epoch, or None
+	def get_epoch(self):
+		return self.epoch
+	
+	# Returns the repeated-state history snapshot, or None
+	def repeat_history(self):
+		return self.history
+	
+	# Returns the time (as from time.time()) by which the player should move,
+	# or None if there is no time limit
+	def get_deadline(self):
+		return self.deadline
+	
+	# Returns the number of expansions left this turn
+	def expansions_count(self):
+		if self.stopped:
+			return 0
+		return self.expansions
+	
+	# Uses up one expansion.  Returns True if it was available, False if the
+	# turn's limit has been reached or the turn has been stopped.
+	def successor_generated(self):
+		if self.stopped or self.expansions <= 0:
+			return False
+		self.expansions -= 1
+		return True
+	
+	# Ends the turn early: refuses any more expansions, and moves the deadline
+	# (if any) up to now.  Used to stop a player pondering from another
+	# thread: it only sets a flag, which the counting methods check, so it
+	# can't be undone by one of them racing it.
+	def stop(self):
+		self.stopped = True
+		if self.deadline != None:
+			self.deadline = time.time()
+	
+	# States call this when a capture (or similar) means earlier positions can
+	# no longer repeat.  Only the controller's own history matters for the
+	# game, so there is nothing to do here.
+	def clear_repeat(self):
+		pass
@@ -1,8 +1,13 @@
 import copy
+import itertools
 import os
 import sys
+import threading
+import time
 import traceback
 
+import game_context
+
 # An exception which is raised if the player objects provided to the 
 # GameController constructor don't line up with the GameState subclass's
 # player IDs.
@@ -13,12 +18,23 @@ class PlayerException(Exception):
 	def __str__(self):
 		return "Player not found %s" % repr(self.player)
 
+# Source of history epochs (see GameController.get_epoch()); shared by all
+# controllers, so an epoch is never handed out twice
+EPOCHS = itertools.count()
+
 # The central controller for a single game of (whatever).
 class GameController:
 	# The game function to be used - minimax, alpha-beta, or tournament?
 	MINIMAX = 0
 	ALPHA_BETA = 1
 	TOURN = 2
+	
+	# Under a game clock, a player is given this fraction of the remaining
+	# time for each move (plus the increment)
+	CLOCK_MOVES = 20
+	# Seconds a player may overrun the per-move time limit before losing
+	# (searches can't stop instantly)
+	TIME_GRACE = 0.5
 
 	# does initial setup of a game
 	#
@@ -31,9 +47,21 @@ class GameController:
 	#   per turn.
 	# "wd" is the working directory that should be restored after each player
 	#   takes a turn.  (In case some player changes the wd and doesn't restore)
+	# "move_time" is the number of seconds each player may take per move, or
+	#   None for no limit.
+	# "clock" is the number of seconds each player has for the whole game, or
+	#   None for no limit; "increment" seconds are added to a player's clock
+	#   after each of his/her moves (a Fischer clock).  A player who runs over
+	#   a time limit loses.
+	# "ponder" is True to let each player think (see GamePlayer.ponder())
+	#   while the other chooses a move, with an allowance of "max_expansions"
+	#   of its own.  Pondering shares the processor with the player moving,
+	#   so it is left off under a time limit, where it would cost that player
+	#   time.
 	#
 	# Raises PlayerException if there's a mismatch between players and gameIDs
-	def __init__(self, state, players, fns, max_expansions, wd):
+	def __init__(self, state, players, fns, max_expansions, wd, \
+			move_time=None, clock=None, increment=0, ponder=False):
 		# Reference and ready the game state
 		self.state = state
 		self.state.clear()
@@ -41,6 +69,8 @@ class GameController:
 		
 		# If game cycles, need state repetition detection
 		self.visitedStates = set()
+		# Changes whenever the game starts over
+		self.epoch = EPOCHS.next()
 		
 		# Maps players' game IDs to player objects
 		self.players = {}
@@ -50,26 +80,57 @@ class GameController:
 		
 		# Make a note of number of remaining expansions
 		self.max_expansions = max_expansions
-		self.expansions = self.max_expansions
+		self.context = game_context.SearchContext(self.max_expansions, None, \
+							self.epoch)
 		
 		# Note the wd in case players open files
 		self.wd = wd
 		
+		# Note the time controls; each player's clock is set in set_players()
+		self.move_time = move_time
+		self.clock = clock
+		self.increment = increment
+		self.clocks = {}
+		
+		self.ponder = ponder and move_time == None and clock == None
+		
 		# Insert players into map
 		self.set_players(players, fns)
 	
 	# only called by self.state
 	# lets the state know how many more expansions it has
+	#
+	# (states handed to players use the turn's SearchContext directly)
 	def expansions_count(self):
-		return self.expansions
+		return self.context.expansions_count()
 		
 	# only called by self.state
 	# decreases the available expansions on this turn by 1
 	def successor_generated(self):
-		if self.expansions <= 0:
-			return False
-		self.expansions -= 1
-		return True
+		return self.context.successor_generated()
+	
+	# only called by self.state
+	# lets the state know when the player to move should have moved by
+	def get_deadline(self):
+		return self.context.get_deadline()
+	
+	# only called by self.state
+	# Returns the set of repeated_rep() values of the positions played since
+	# the history was last cleared, or None if the game doesn't cycle
+	def repeat_history(self):
+		if not self.state.repeats():
+			return None
+		return self.visitedStates
+	
+	# only called by self.state
+	# Returns a number which changes whenever the game is reset.  Players
+	# which keep search results from one turn to the next use it to tell when
+	# to throw them away.  (Clearing the repeated-state history doesn't
+	# change it.  A result kept across a capture may be wrong if its value
+	# depended on a repeat, since the history is then different; see
+	# game_search.py.)
+	def get_epoch(self):
+		return self.epoch
 	
 	# only called by self and self.state
 	#
@@ -88,6 +149,13 @@ class GameController:
 	def clear_repeat(self):
 		self.visitedStates.clear()
 	
+	# Returns a copy of the repeated-state history for a search context, or
+	# None if the game doesn't cycle
+	def history_snapshot(self):
+		if not self.state.repeats():
+			return None
+		return frozenset(self.visitedStates)
+	
 	# Sets up player objects corresponding to game IDs
 	# 
 	# "players" is a list of objects whose type is a game-specific subclass
@@ -105,12 +173,79 @@ class GameController:
 					break
 			if p not in self.players:
 				raise PlayerException(p)
+		self.reset_clocks()
+	
+	# Puts every player's clock back to the starting time
+	def reset_clocks(self):
+		self.clocks.clear()
+		for p in self.state.get_players():
+			self.clocks[p] = self.clock
+	
+	# Returns the number of seconds the indicated player may think about the
+	# next move, or None if there's no limit
+	def time_allowance(self, player):
+		if self.clock != None:
+			return min(self.clocks[player], \
+				float(self.clocks[player]) / GameController.CLOCK_MOVES \
+					+ self.increment)
+		return self.move_time
+	
+	# Charges "elapsed" seconds of thinking time to the indicated player.
+	#
+	# Returns True if the player stayed within the time limit, False else
+	def charge_time(self, player, elapsed):
+		if self.clock != None:
+			self.clocks[player] -= elapsed
+			if self.clocks[player] < 0:
+				return False
+			self.clocks[player] += self.increment
+		elif self.move_time != None:
+			return elapsed <= self.move_time + GameController.TIME_GRACE
+		return True
+	
+	# Has the indicated player start pondering in the background, if pondering
+	# is on.  Returns a (thread, context) pair to hand to stop_pondering(), or
+	# None.
+	def start_pondering(self, player):
+		if not self.ponder:
+			return None
+		context = game_context.SearchContext(self.max_expansions, None, \
+							self.epoch, self.history_snapshot())
+		state = self.state.get_player_state(player)
+		state.setController(context, False)
+		thread = threading.Thread(target=self.run_ponder, args=(player, state))
+		thread.daemon = True
+		thread.start()
+		return (thread, context)
+	
+	# Body of the pondering thread for the indicated player
+	def run_ponder(self, player, state):
+		try:
+			self.players[player][0].ponder(state)
+		except:
+			print "Exception thrown by player", player, \
+						"(", self.players[player][0].get_name(), ")", \
+						"while pondering"
+			print
+			traceback.print_exc()
+			print
+	
+	# Stops pondering started by start_pondering() (which returned
+	# "pondering"), and waits for the player to finish up
+	def stop_pondering(self, pondering):
+		if pondering == None:
+			return
+		thread, context = pondering
+		context.stop()
+		thread.join()
 	
 	# Reset the game
 	def reset(self):
+		self.epoch = EPOCHS.next()
 		self.clear_repeat()
 		self.state.clear()
 		self.nextPlayer = self.state.get_next_player()
+		self.reset_clocks()
 	
 	# Make one move (actually one ply) within the game
 	# Returns a tuple (move, winner)
@@ -133,16 +268,20 @@ class GameController:
 		
 		# If there are no remaining moves for this player, either the other
 		# player has won or it's a draw
-		self.expansions = 1
-		if len(self.state.successors()) == 0:
+		if not self.state.has_legal_moves():
 			if self.state.is_win(otherPlayer):
 				return (None, otherPlayer)
 			else:
 				# None, None for a draw
 				return (None, None)
 			
-		# allow the player max_expansions for this turn
-		self.expansions = self.max_expansions
+		# allow the player max_expansions (and any time allowance) for this
+		#  turn, counted by a fresh search context rather than by us
+		start = time.time()
+		allowance = self.time_allowance(self.nextPlayer)
+		deadline = start + allowance if allowance != None else None
+		self.context = game_context.SearchContext(self.max_expansions, \
+							deadline, self.epoch, self.history_snapshot())
 		
 		# are we using alpha-beta, minimax, or tournament?
 		fn = self.players[self.nextPlayer][1]
@@ -157,10 +296,19 @@ class GameController:
 		move = None
 		lastPlayer = None
 		
+		# the other player may think in the meantime
+		pondering = self.start_pondering(otherPlayer)
+		
 		# player may throw an exception
 		try:
 			# get player's move, make sure we don't modify the current state
-			move = move_fun(self.state.get_player_state(self.nextPlayer))
+			playerState = self.state.get_player_state(self.nextPlayer)
+			playerState.setController(self.context, False)
+			move = move_fun(playerState)
+			# player may have run out of time
+			if not self.charge_time(self.nextPlayer, time.time() - start):
+				print "Player", self.nextPlayer, "ran out of time."
+				return (None, otherPlayer)
 			# player may give up
 			if move.is_forfeit():
 				print "Player", self.nextPlayer, "forfeits."
@@ -181,6 +329,8 @@ class GameController:
 			traceback.print_exc()
 			print
 			return (None, otherPlayer)
+		finally:
+			self.stop_pondering(pondering)
 		
 		os.chdir(self.wd)
 		
@@ -211,6 +361,10 @@ class GameController:
 			if move != None and not quiet:
 				print "%s:" % self.players[move.get_player()][0].get_name(), \
 									move
+				if self.clock != None:
+					print "Time left:", ", ".join(["%s %.1fs" \
+						% (self.players[p][0].get_name(), self.clocks[p]) \
+						for p in self.state.get_players()])
 				print 
 		if not quiet:
 			print self.state
@@ -0,0 +1,79 @@
+# Move ordering for alpha-beta search.
+#
+# Alpha-beta prunes the most when the best move at each node is searched
+# first; with perfect ordering it visits roughly the square root of the
+# positions minimax would.  Games generate moves in a fixed order (Oware's
+# successor_moves() always gives pits 0-5), so MoveOrdering sorts them using
+# what the search has learned so far, trying in turn:
+#   1. the best move the transposition table has for the position
+#   2. captures (GameState.is_capture())
+#   3. the killer moves for the ply: quiet moves which recently caused a
+#      cutoff at the same depth in the tree, in a sibling position
+#   4. the rest, by their history score: how much cutoff-causing work each
+#      move has done anywhere in the tree
+#
+# The killer and history tables are kept until clear() is called, so that one
+# iteration of an iterative-deepening search passes what it learned on to the
+# next; age() keeps them for the next turn as well.  Moves are used as
+# dictionary keys, so they must hash by value (see GameMove.__hash__()).
+class MoveOrdering(object):
+	# Number of killer moves kept per ply
+	KILLERS = 2
+	
+	def __init__(self):
+		# killers[ply] is a list of up to KILLERS moves, most recent first
+		self.killers = []
+		# Maps moves to their history scores
+		self.history = {}
+	
+	# Forgets all the killer moves and history scores
+	def clear(self):
+		self.killers = []
+		self.history = {}
+	
+	# Ready the tables for a search "plies" plies further into the game than
+	# the last one (2 for a player's next turn): the killers move up to the
+	# plies they now belong to, and history scores are halved so that recent
+	# cutoffs count for more.
+	def age(self, plies=2):
+		self.killers = self.killers[plies:]
+		for move in self.history:
+			self.history[move] /= 2
+	
+	# Sorts "moves", a list of the moves from "state", into the order to search
+	# them, in place.
+	#
+	# "best" is the transposition table's move for the position (or None);
+	# "ply" is how many plies below the root "state" is.
+	def order(self, state, moves, best, ply):
+		killers = self.killers[ply] if ply < len(self.killers) else ()
+		history = self.history
+		# Sort on a tuple: (group, -history score); lower groups go first
+		keys = {}
+		for move in moves:
+			if move == best:
+				group = 0
+			elif state.is_capture(move):
+				group = 1
+			elif move in killers:
+				group = 2
+			else:
+				group = 3
+			keys[move] = (group, -history.get(move, 0))
+		moves.sort(key=keys.__getitem__)
+	
+	# Notes that "move" caused a beta cutoff in "state", searched "depth" plies
+	# deep, "ply" plies below the root.  Captures are already tried early, so
+	# only quiet moves are remembered.
+	def cutoff(self, state, move, depth, ply):
+		if state.is_capture(move):
+			return
+		while len(self.killers) <= ply:
+			self.killers.append([])
+		killers = self.killers[ply]
+		if move in killers:
+			killers.remove(move)
+		killers.insert(0, move)
+		del killers[MoveOrdering.KILLERS:]
+		# Deeper cutoffs save more work, so count for more
+		self.history[move] = self.history.get(move, 0) + depth * depth
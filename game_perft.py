@@ -0,0 +1,68 @@
+import sys
+import time
+
+# Move-generation benchmark and correctness check ("perft", after the chess
+# engine tool of the same name).
+#
+# perft() walks the complete game tree to a fixed depth with successor_moves(),
+# make_move() and unmove(), without any expansion limit, and counts the
+# positions at that depth.  The counts depend only on the rules, so any change
+# to a game's move generation must leave them alone; the time taken measures
+# how fast it is.
+#
+# Cycles are NOT handled: the repeated-state rule (GameState.repeats(),
+# handle_cycle()) depends on the history of the game being played, not just
+# on the position, so perft counts every line as if it had no history.
+
+
+# Leaf counts from each game's starting position, for depths 1, 2, 3, ...
+# These were produced by the original, unoptimized move generation.
+REFERENCE_COUNTS = {
+	'Oware': [6, 36, 190, 1014, 5219, 27332, 139157, 711414],
+	'TicTacToe': [9, 72, 504, 3024, 15120, 54720, 148176, 200448, 127872],
+}
+
+# Returns the number of positions reachable from "state" in exactly "depth"
+# plies.  Positions where the game is over (someone has won, or the player to
+# move has no moves) have no children.
+#
+# "state" is an object whose type is a game-specific subclass of GameState; it
+# is modified during the walk but restored before returning.  It should have no
+# controller, so that successor_moves() never refuses an expansion.
+def perft(state, depth):
+	if depth == 0:
+		return 1
+	players = state.get_players()
+	if state.is_win(players[0]) or state.is_win(players[1]):
+		return 0
+	count = 0
+	for move in state.successor_moves():
+		record = state.make_move(move)
+		count += perft(state, depth - 1)
+		state.unmove(record)
+	return count
+
+# Runs perft() at every depth from 1 to "depth", printing the leaf count, time
+# and speed for each (as with chess perft, nodes/sec counts leaf nodes).  If
+# "reference" is a list of expected counts (such as an entry in
+# REFERENCE_COUNTS), each count is checked against it.
+#
+# Returns True if every count that could be checked matched, False else.
+def run_perft(state, depth, reference=None, out=sys.stdout):
+	ok = True
+	out.write("%5s %14s %10s %12s\n" % ("depth", "leaves", "seconds", \
+			"nodes/sec"))
+	for d in range(1, depth + 1):
+		start = time.time()
+		count = perft(state, d)
+		elapsed = time.time() - start
+		rate = count / elapsed if elapsed > 0 else float('inf')
+		line = "%5d %14d %10.3f %12.0f" % (d, count, elapsed, rate)
+		if reference != None and d <= len(reference):
+			if count == reference[d-1]:
+				line += "  ok"
+			else:
+				line += "  MISMATCH (expected %d)" % reference[d-1]
+				ok = False
+		out.write(line + "\n")
+	return ok
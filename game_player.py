@@ -6,6 +6,8 @@
 #   minimax_move()
 #   alpha_beta_move()
 #   tournament_move()
+# and optionally:
+#   ponder()
 class GamePlayer:
 	# "name" is a string identifier for the player (the default game framework
 	# value is the module name)
@@ -52,4 +54,18 @@ class GamePlayer:
 	#
 	# Or, performs special behavior if you like
 	def tournament_move(self, state):
+		pass
+	
+	# Override in subclass to think on the opponent's time
+	#
+	# If the game is played with pondering on, this is called in a background
+	# thread while the opponent chooses a move.  "state" is the position the
+	# opponent is moving from, carrying a search context of its own: the
+	# expansions used here never come out of either player's allowance for a
+	# turn, and once the opponent has moved the context refuses any more, so
+	# a search stops soon after.  Whatever the player learns is its own to use
+	# on its next turn, which won't start until this has returned.
+	#
+	# "state" is an object whose type is a game-specific subclass of GameState
+	def ponder(self, state):
 		pass
\ No newline at end of file
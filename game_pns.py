@@ -0,0 +1,378 @@
+import collections
+import time
+
+import game_solver
+
+# Proof-number search, which works on any GameState subclass: proves what a
+# position is worth -- WIN, DRAW or LOSS for the player to move, as
+# GameSolver's results -- without looking at the whole game tree.
+#
+# Each question it answers is "can the player to move make sure of at least
+# this result?".  Every position it has looked at has a proof number (the
+# fewest positions which would still have to be shown to go the player's way
+# to prove that it can) and a disproof number (likewise, to show that it
+# can't); the search always expands the position on which proving or
+# disproving the root would cheapest be settled, so it goes deep where the
+# opponent's replies are forced and stays shallow where they aren't.  This is
+# the depth-first form of the search (df-pn): it recurses into a position
+# until its numbers pass thresholds set by its parent, keeping the numbers of
+# every position in a table rather than the tree in memory.
+#
+# A win is a proof that the player to move can make sure of a win; failing
+# that, a draw is a proof that they can make sure of at least a draw.
+#
+# In games which cycle, a line ends when it repeats a position played since
+# the repeated-state history was last cleared, scored as handle_cycle() leaves
+# the game, as in GameSolver.  Proofs and disproofs along lines which no
+# repeat cut short hold however a position is reached, so they are kept by
+# its GameSolver entry key alone; those which a repeat did are kept for the
+# line they were found on.  The numbers of positions not yet proved or
+# disproved are only estimates, kept by entry key and the length of the
+# history.  Lines longer than MAX_PLY plies are counted as draws.
+#
+# The search stops, answering None, once it has expanded a given number of
+# positions, or its table can't be kept to a given size, or the controller
+# refuses an expansion, or a deadline passes.  Given an endgame database (as
+# GameSearch takes), positions the database knows are settled by looking
+# them up.
+
+# Larger than any proof or disproof number which isn't infinite
+INFINITY = 10**9
+# Longest line the search plays out
+MAX_PLY = 400
+# Number of ages the table's entries are told apart by, for throwing the
+# oldest away when it is full
+AGES = 8
+
+# Raised inside a search which has to stop before it has an answer
+class ProofAborted(Exception):
+	pass
+
+class ProofNumberSearch(object):
+	# "nodes" is the most positions to expand per solve()
+	#
+	# "entries" is the most positions to keep numbers for (at each level of
+	# question).  Entries are keyed by position and history length rather
+	# than by the history itself, so each costs much the same, some 400 bytes.
+	# When the table is full, the numbers of positions not yet proved or
+	# disproved (or only for some line) are thrown away, those stored longest
+	# ago first, and the search gives up if that doesn't free enough room.
+	#
+	# "endgame" is an endgame database with probe() as for GameSearch, or None
+	def __init__(self, nodes=10**6, entries=10**6, endgame=None):
+		self.maxNodes = nodes
+		self.maxEntries = entries
+		self.endgame = endgame
+		# Maps table keys (see table_keys()) to (proof, disproof, visit, age)
+		#  tuples: visit is None, unless the position was proved or
+		#  disproved only for the line it was reached by, when it is the
+		#  search() call the line went through just before; age is when the
+		#  numbers were stored
+		self.table = {}
+		# (age, list of keys) pairs, oldest first, of the entries which may
+		#  be thrown away (a key may be listed again after it is stored again)
+		self.ages = collections.deque()
+		# The age entries stored now get, and how many have been stored
+		self.age = 0
+		self.stores = 0
+		# Number of search() calls made, each of which is known by the number
+		#  it was
+		self.visits = 0
+		# Maps the entry keys of the positions on the current line to how
+		#  many of them have each
+		self.line = {}
+		# Number of positions expanded by the last solve()
+		self.nodes = 0
+		# Time (as from time.time()) to stop by, or None
+		self.deadline = None
+		# The move which proves the root, once it is proved
+		self.proofMove = None
+		# Gives the table keys, and keeps track of repeated positions
+		self.keys = game_solver.GameSolver()
+	
+	# Finds the result of "state": returns a (result, move) tuple, result
+	# being WIN, DRAW or LOSS (see GameSolver) for the player to move, or None
+	# if the search had to stop first, and move a move which achieves a win or
+	# draw (None otherwise).
+	#
+	# "deadline" is a time (as from time.time()) to stop by, or None.
+	# Expansions are counted against the state's controller, if it has one.
+	def solve(self, state, deadline=None):
+		self.nodes = 0
+		self.deadline = deadline
+		# What was proved for another position may have been proved along
+		#  lines through this one or its history
+		self.clear()
+		for level in (game_solver.GameSolver.WIN, game_solver.GameSolver.DRAW):
+			proved, move = self.prove(state, level)
+			if proved == None:
+				return (None, None)
+			if proved:
+				return (level, move)
+		return (game_solver.GameSolver.LOSS, None)
+	
+	# Tries to prove that the player to move in "state" can make sure of at
+	# least the result "level".  Returns a (proved, move) tuple: proved is True
+	# or False, or None if the search had to stop first; move is a move which
+	# makes sure of it if proved.
+	def prove(self, state, level):
+		if state.repeats():
+			history = state.repeat_history()
+			if history == None:
+				history = [state.repeated_rep()]
+			self.keys.seen = set(history)
+			# As for GameSolver.solve()
+			self.keys.own = \
+					len(self.keys.seen - set([state.repeated_rep()])) > 0
+		else:
+			self.keys.seen = None
+		state = state.make_copy()
+		self.proofMove = None
+		self.line = {}
+		self.visits += 1
+		root = self.visits
+		try:
+			self.search(state, level, INFINITY, INFINITY, 0, root)
+			proof, disproof, cut = \
+					self.numbers(self.table_keys(state, level), root)
+			if proof != 0:
+				return (False, None)
+			return (True, self.proofMove)
+		except ProofAborted:
+			return (None, None)
+		finally:
+			self.keys.seen = None
+			self.keys.own = False
+	
+	# Returns the table keys of "state" when the question is "level": the key
+	# a proof or disproof which holds for every line is kept by, and the key
+	# its numbers are kept by otherwise.  In games which cycle, the second
+	# has the length of the history too: the numbers of positions are passed
+	# on to those before them on the line, so numbers kept by position alone
+	# could be passed round a cycle and grow without end.
+	def table_keys(self, state, level):
+		key = self.keys.entry_key(state)
+		if self.keys.seen == None:
+			return ((key, level), (key, level))
+		return ((key, level), (key, len(self.keys.seen), level))
+	
+	# Returns the (proof, disproof, cut) numbers known for the table keys
+	# "keys" (see table_keys()) to the search() call "visit", cut being True
+	# if they prove or disprove the position only for the line it was reached
+	# by
+	def numbers(self, keys, visit):
+		entry = self.table.get(keys[0])
+		if entry != None and entry[2] == None and 0 in entry[:2]:
+			return (entry[0], entry[1], False)
+		entry = self.table.get(keys[1])
+		if entry == None:
+			return (1, 1, False)
+		proof, disproof, line, age = entry
+		if line == None:
+			return (proof, disproof, False)
+		if line == visit:
+			return (proof, disproof, True)
+		return (1, 1, False)
+	
+	# Returns the numbers of a position whose result for the player to move,
+	# "result", is already known, when the question is "level"
+	def settled(self, result, level):
+		if result >= level:
+			return (0, INFINITY)
+		return (INFINITY, 0)
+	
+	# Returns the result of "state" for the player to move if it is settled
+	# without searching (the game is over, the line is too long, or the
+	# endgame database knows it), or None
+	def known_result(self, state, ply):
+		over, winner = state.terminal_status()
+		if over:
+			return self.keys.final_result(state, winner)
+		if ply >= MAX_PLY:
+			return game_solver.GameSolver.DRAW
+		if self.endgame != None:
+			plies = self.endgame.probe(state)
+			if plies != None:
+				return cmp(plies, 0)
+		return None
+	
+	# Expands "state": returns a list of (move, numbers, keys) tuples, one per
+	# move, where numbers are the (proof, disproof, cut) numbers of the
+	# position the move leads to if they are settled already (see numbers()),
+	# or else None and keys are the table keys of that position.  "level" is
+	# the question at "state".
+	def children(self, state, level):
+		moves = state.successor_moves()
+		if moves == None:
+			raise ProofAborted()
+		self.nodes += 1
+		if self.nodes > self.maxNodes:
+			raise ProofAborted()
+		if self.deadline != None and self.nodes % 64 == 0 \
+				and time.time() > self.deadline:
+			raise ProofAborted()
+		childLevel = 1 - level
+		found = []
+		for move in moves:
+			token = self.play(state, move)
+			if token[3]:
+				final = state.make_copy()
+				final.handle_cycle()
+				over, winner = final.terminal_status()
+				result = self.keys.final_result(final, winner) if over \
+						else game_solver.GameSolver.DRAW
+				found.append((move, \
+						self.settled(result, childLevel) + (True,), None))
+			else:
+				result = self.known_result(state, 0)
+				if result != None:
+					found.append((move, \
+							self.settled(result, childLevel) + (False,), None))
+				else:
+					found.append((move, None, \
+							self.table_keys(state, childLevel)))
+			self.take_back(state, token)
+		return found
+	
+	# Searches "state", "ply" plies from the root, until its (proof, disproof)
+	# numbers for the question "level" reach the thresholds "proof" or
+	# "disproof", and records them in the table.  "parent" is the search()
+	# call this one is made from.
+	#
+	# A position proved or disproved along lines none of which a repeat cut
+	# short is so however it is reached, much as for GameSolver.search(): the
+	# positions on those lines are kept in the table, and none can be on the
+	# line to it, as the search would have looked them up rather than search
+	# them.  The others are kept for the line they were reached by alone.
+	def search(self, state, level, proof, disproof, ply, parent):
+		keys = self.table_keys(state, level)
+		result = self.known_result(state, ply)
+		if result != None:
+			self.store(keys, self.settled(result, level), ply >= MAX_PLY, \
+					parent)
+			return
+		children = self.children(state, level)
+		self.visits += 1
+		visit = self.visits
+		# While a position equivalent to this one is further up the line,
+		#  proofs are kept to the line
+		key = keys[0][0]
+		count = self.line.get(key, 0)
+		self.line[key] = count + 1
+		try:
+			while True:
+				# The player to move gets there through whichever child is
+				#  easiest to disprove for the opponent, and is stopped only if
+				#  every child is proved for the opponent
+				least = INFINITY
+				second = INFINITY
+				total = 0
+				best = None
+				# Whether every disproved child is so for this line alone,
+				#  and whether any child is
+				proofCut = True
+				anyCut = False
+				for i, (move, known, childKeys) in enumerate(children):
+					childProof, childDisproof, childCut = known or \
+							self.numbers(childKeys, visit)
+					total = min(INFINITY, total + childProof)
+					if childDisproof < least:
+						second = least
+						least = childDisproof
+						best = i
+						bestProof = childProof
+					elif childDisproof < second:
+						second = childDisproof
+					if childDisproof == 0 and not childCut:
+						proofCut = False
+					anyCut = anyCut or childCut
+				cut = count > 0 or (least == 0 and proofCut) \
+						or (total == 0 and anyCut)
+				self.store(keys, (least, total), cut, parent)
+				if least == 0 and ply == 0:
+					self.proofMove = children[best][0]
+				if least >= proof or total >= disproof:
+					return
+				move, known, childKeys = children[best]
+				token = self.play(state, move)
+				try:
+					self.search(state, 1 - level, \
+							disproof - total + bestProof, \
+							min(proof, second + 1), ply + 1, visit)
+				finally:
+					self.take_back(state, token)
+		finally:
+			if count == 0:
+				del self.line[key]
+			else:
+				self.line[key] = count
+	
+	# Records the numbers "numbers" under the table keys "keys" (see
+	# table_keys()), making room if need be.  If "cut" is True, a proof or
+	# disproof holds only for the line through the search() call "parent".
+	def store(self, keys, numbers, cut, parent):
+		visit = None
+		if 0 not in numbers:
+			key = keys[1]
+		elif cut:
+			key = keys[1]
+			visit = parent
+		else:
+			key = keys[0]
+		if len(self.table) >= self.maxEntries and key not in self.table:
+			self.make_room()
+		self.table[key] = numbers + (visit, self.age)
+		if visit != None or 0 not in numbers:
+			if len(self.ages) == 0 or self.ages[-1][0] != self.age:
+				self.ages.append((self.age, []))
+			self.ages[-1][1].append(key)
+		self.stores += 1
+		if self.stores % max(1, self.maxEntries / AGES) == 0:
+			self.age += 1
+	
+	# Throws away the numbers of positions not yet proved or disproved (or
+	# only for some line), oldest first, until the table is no more than
+	# three-quarters full; raises ProofAborted if it can't be
+	def make_room(self):
+		while len(self.table) >= self.maxEntries * 3 / 4:
+			if len(self.ages) == 0:
+				raise ProofAborted()
+			age, keys = self.ages.popleft()
+			for key in keys:
+				entry = self.table.get(key)
+				if entry != None and entry[3] == age \
+						and (entry[2] != None or 0 not in entry[:2]):
+					del self.table[key]
+	
+	# Makes "move" on "state", keeping track of the positions the line may not
+	# repeat as GameSearch.play() does
+	def play(self, state, move):
+		seen = self.keys.seen
+		if seen == None:
+			return (state.make_move(move), None, None, False)
+		saved = None
+		if state.clears_repeats(move):
+			saved = seen
+			self.keys.seen = seen = set()
+		record = state.make_move(move)
+		rep = state.repeated_rep()
+		if rep in seen:
+			return (record, saved, None, True)
+		seen.add(rep)
+		return (record, saved, rep, False)
+	
+	# Undoes a move made by play(), which returned "token"
+	def take_back(self, state, token):
+		record, saved, rep, cycle = token
+		state.unmove(record)
+		if rep != None:
+			self.keys.seen.remove(rep)
+		if saved != None:
+			self.keys.seen = saved
+	
+	# Forgets all the proof and disproof numbers
+	def clear(self):
+		self.table = {}
+		self.ages = collections.deque()
+		self.age = 0
+		self.stores = 0
@@ -0,0 +1,783 @@
+import sys
+import time
+
+import game_ordering
+import game_table
+
+# A game-tree search engine which works on any GameState subclass.
+#
+# Players create a GameSearch with their evaluation function and call
+# minimax() or alpha_beta() from their move functions instead of writing their
+# own searches.  The engine searches in negamax form (every value is from the
+# point of view of the player to move, and a child's value is negated on the
+# way up), plays moves on a single state with make_move() and unmove() rather
+# than copying a state per node, and stops expanding once the controller's
+# expansion limit for the turn is reached, evaluating whatever it has.
+#
+# Given a transposition table (see game_table.py), the engine also remembers
+# the results of positions it has searched, reuses them when it reaches the
+# same position again, and tries the best move it found there first.  Given a
+# game_ordering.MoveOrdering as well, alpha-beta searches also try captures,
+# killer moves and moves with good history early.
+#
+# iterative_deepening() searches one ply deeper at a time until the turn's
+# expansions or time (see GameController's time controls) run out, and always
+# answers with the result of a completed search rather than one cut short.
+#
+# pvs() (and iterative_deepening() with pvs=True) does a principal variation
+# search: once a node's first move has been searched, every other move is
+# only tested against a null window -- can it beat the first? -- which
+# prunes far more, and is searched again with the full window only if it can.
+# With good move ordering the first move is usually best, so re-searches are
+# rare.  Iterative deepening then also searches each iteration in an
+# aspiration window around the previous iteration's value, widening it if
+# the value falls outside.
+#
+# mtdf() (and iterative_deepening() with driver=MTDF) finds the value by
+# MTD(f) instead: a series of null-window searches ("passes"), each of which
+# only tells whether the value is above or below a test value, homing in from
+# a first guess.  The transposition table carries what each pass learned to
+# the next, so the passes after the first are cheap; give the engine a table
+# to use it.
+#
+# Values needn't be integers, so a null window is one with alpha == beta: a
+# search in it returns a value above it (a lower bound), below it (an upper
+# bound) or exactly on it (the exact value).
+#
+# Given keep=True, the engine keeps its table and move ordering from one
+# search to the next, so a player's turn starts with what its previous turn
+# learned -- usually including the position it is now in, if the opponent
+# replied as predicted.  Everything is thrown away when the game's epoch
+# changes (GameState.get_epoch()), which is when the game is reset.  Clearing
+# the repeated-state history (as an Oware capture does) keeps everything too,
+# though that isn't exact.  A value found where some line was cut short by a
+# repeat depends on the positions played before it, so it may be wrong when
+# the position comes up again after different ones.  (This is the
+# graph-history interaction problem, which GameSolver handles exactly.)  The
+# search accepts such errors for what the kept results save, as it does for
+# positions reached by different lines within one search.
+#
+# In games which cycle, the search follows the controller's rule for repeated
+# positions: a line which repeats a position played since the repeated-state
+# history was last cleared (GameState.repeat_history()), or one earlier in the
+# same line, ends there, scored as handle_cycle() would leave the game.  A
+# move which clears the history (GameState.clears_repeats()) clears it for the
+# rest of the line too.
+#
+# ponder() uses the opponent's thinking time (see GamePlayer.ponder()): it
+# plays the reply the last search predicted and searches the position that
+# leaves.  If the opponent does reply that way, the next search carries on
+# with everything the pondering found; if not, it starts fresh.
+#
+# With quiescence search on, alpha-beta searches don't evaluate a position at
+# the horizon while a capture is pending (see GameState.is_quiet()): they play
+# out the tactical moves first, letting each side stand pat on the static
+# value instead, up to a share of the turn's expansions.
+#
+# Given an endgame database, the search takes the value of any position the
+# database knows from it, at no cost in expansions, instead of searching it.
+
+# Value of a won position.  A win found "ply" plies from the root scores
+# WIN - ply, so quicker wins are preferred (and slower losses).
+WIN = sys.maxint
+# Larger than any value a search can return
+INFINITY = float('inf')
+# Deeper than any search will go (wins within this many plies of WIN are
+# adjusted for distance when stored in a transposition table)
+MAX_PLY = 1000
+# Most plies quiescence search goes past the horizon
+QUIESCENCE_PLY = 8
+
+# Converts a value found "ply" plies below the root into the form stored in a
+# transposition table.  Win and loss values count plies from the root, but an
+# entry may be found again at a different ply, so they are stored counting
+# from the position itself.
+def value_to_table(value, ply):
+	if value >= WIN - MAX_PLY:
+		return value + ply
+	if value <= -(WIN - MAX_PLY):
+		return value - ply
+	return value
+
+# Does the reverse of value_to_table() for a value found "ply" plies below
+# the root
+def value_from_table(value, ply):
+	if value >= WIN - MAX_PLY:
+		return value - ply
+	if value <= -(WIN - MAX_PLY):
+		return value + ply
+	return value
+
+# Raised inside a search which has to stop before it is finished (see
+# GameSearch.iterative_deepening())
+class SearchAborted(Exception):
+	pass
+
+# Returns True if the controller won't allow any more expansions of "state"
+# this turn.  A state with no controller can be expanded without limit.
+def out_of_expansions(state):
+	count = state.expansions_count()
+	return count != None and count <= 0
+
+class GameSearch(object):
+	# Drivers for iterative_deepening(): the search each iteration uses
+	ALPHA_BETA = 0
+	PVS = 1
+	MTDF = 2
+	
+	# "evaluate" is a function taking a GameState and returning a number which
+	# is positive when the position favours the FIRST player of
+	# state.get_players(), and negative when it favours the second (the usual
+	# convention for GamePlayer.evaluate()).
+	#
+	# "table" is a game_table.TranspositionTable to use, or None to search
+	# without one.  The state's hash_key() must be implemented to use one.
+	#
+	# "ordering" is a game_ordering.MoveOrdering to sort moves with in
+	# alpha-beta searches, or None to search them in the order the state
+	# generates them (best move from the table first).
+	#
+	# "window" is the half-width of the first aspiration window tried, and
+	# how far below its guess MTD(f) first tests, in the units "evaluate"
+	# returns.
+	#
+	# "quiescence" is the share (0-1) of each turn's expansions which
+	# quiescence search may use, or 0 to search without it.
+	#
+	# "keep" is True to keep the table and move ordering between searches for
+	# as long as the game's epoch stays the same.
+	#
+	# "endgame" is an endgame database to look positions up in (such as an
+	# oware_endgame.EndgameDatabase), or None.  Its probe(state) returns None
+	# for a position it doesn't know, 0 for a draw, and for a win or loss a
+	# positive or negative number of plies to count it as being away.
+	def __init__(self, evaluate, table=None, ordering=None, window=1.0, \
+			quiescence=0, keep=False, endgame=None):
+		self.evaluate = evaluate
+		self.table = table
+		self.ordering = ordering
+		self.window = window
+		self.quiescence = quiescence
+		self.keep = keep
+		self.endgame = endgame
+		# Game epoch of the last search's state
+		self.epoch = None
+		# The principal variation found by the last search: the moves it
+		#  expects both players to make, starting with its answer
+		self.pv = []
+		# The (hash key, move) the last search expects to play next turn: the
+		#  position after its first two moves, and the third
+		self.expected = None
+		# A move to try first at the root if the table has none
+		self.rootHint = None
+		# Hash key of the position ponder() last searched, or None
+		self.pondered = None
+		# True if the last search was of the position pondered
+		self.ponderHit = False
+		# The repeated_rep() values of the positions which the current line
+		#  may not repeat (the game's history and the line so far), or None if
+		#  the game doesn't cycle
+		self.seen = None
+		# Expansions quiescence search may still use this search (None for no
+		#  limit)
+		self.quiescenceLeft = 0
+		# True while the current search is a principal variation search
+		self.variation = False
+		# The table and ordering the current search uses (minimax() uses
+		#  neither)
+		self.active = None
+		self.sorter = None
+		# Number of positions visited by the most recent search
+		self.nodes = 0
+		# Number of null-window searches made by the most recent MTD(f) search
+		self.passes = 0
+		# Depth of the last search completed by iterative_deepening()
+		self.depth = 0
+		# While True, running out of expansions or time raises SearchAborted
+		#  instead of settling for a static evaluation
+		self.abortable = False
+		# Time (as from time.time()) to stop by, or None
+		self.deadline = None
+		# The best (value, move) found so far by the search at the root
+		self.rootBest = None
+	
+	# Returns the value of a position where the search stops, from the point
+	# of view of the player to move
+	def static_value(self, state):
+		value = self.evaluate(state)
+		if state.get_next_player() == state.get_players()[0]:
+			return value
+		return -value
+	
+	# Returns the value of a finished game, from the point of view of the
+	# player to move, "ply" plies from the root
+	def terminal_value(self, state, winner, ply):
+		if winner == None:
+			return 0
+		if winner == state.get_next_player():
+			return WIN - ply
+		return -(WIN - ply)
+	
+	# Returns the value of "state", "ply" plies from the root, from the
+	# point of view of the player to move, if the endgame database knows it,
+	# or None
+	def known_value(self, state, ply):
+		if self.endgame == None:
+			return None
+		plies = self.endgame.probe(state)
+		if plies == None or plies == 0:
+			return plies
+		if plies > 0:
+			return WIN - (ply + plies)
+		return -(WIN - (ply - plies))
+	
+	# Searches "depth" plies ahead of "state" without pruning (or the
+	# transposition table, which would make it something other than minimax).
+	#
+	# Returns a (value, move) tuple: the minimax value of the state from the
+	# point of view of the player to move, and the move that achieves it (None
+	# if the game is already over or no expansion was allowed).
+	def minimax(self, state, depth):
+		self.start(state, None, None, False, False)
+		return self.root(state, depth, -INFINITY, INFINITY, False)
+	
+	# Searches "depth" plies ahead of "state" with alpha-beta pruning.
+	#
+	# Returns a (value, move) tuple as for minimax().
+	def alpha_beta(self, state, depth):
+		self.start(state, self.table, self.ordering)
+		return self.finish(state, \
+				self.root(state, depth, -INFINITY, INFINITY, True))
+	
+	# Searches "depth" plies ahead of "state" with principal variation search.
+	#
+	# Returns a (value, move) tuple as for minimax(); the value is the same as
+	# alpha_beta() finds.
+	def pvs(self, state, depth):
+		self.start(state, self.table, self.ordering, True)
+		return self.finish(state, \
+				self.root(state, depth, -INFINITY, INFINITY, True))
+	
+	# Searches "depth" plies ahead of "state" with MTD(f), starting from the
+	# guess that the value is "guess".  Sets "passes" to the number of
+	# null-window searches it took.
+	#
+	# Returns a (value, move) tuple as for minimax(); the value is the same as
+	# alpha_beta() finds.
+	def mtdf(self, state, depth, guess=0):
+		self.start(state, self.table, self.ordering)
+		return self.finish(state, self.converge(state, depth, guess))
+	
+	# Thinks on the opponent's time.  "state" is the position the opponent is
+	# to move from, which should be the one the last search's move led to;
+	# plays the reply that search predicted, and searches the position after
+	# it with iterative_deepening() (using "driver") until the state's
+	# context runs out or is stopped.
+	#
+	# Returns True if there was a prediction to ponder, False else.
+	def ponder(self, state, driver=ALPHA_BETA):
+		self.pondered = None
+		if len(self.pv) < 2 or not state.is_valid_move(self.pv[1]):
+			return False
+		record = state.make_move(self.pv[1])
+		try:
+			key = state.hash_key()
+			if key == None:
+				return False
+			over, winner = state.terminal_status()
+			if not over:
+				self.iterative_deepening(state, driver=driver)
+			self.pondered = key
+		finally:
+			state.unmove(record)
+		return True
+	
+	# Searches "state" with alpha-beta pruning one ply deeper at a time, up to
+	# "maxDepth" plies, until the turn's expansions or time run out or the
+	# outcome of the game is settled.
+	#
+	# An iteration which is cut short is abandoned, so the answer always comes
+	# from a completed search -- except that if the interrupted iteration has
+	# finished searching the previous best move (which it tries first), the
+	# best of the moves it finished is at least as good, so that is used.
+	#
+	# "driver" says how each iteration searches: ALPHA_BETA, PVS (principal
+	# variation search in an aspiration window) or MTDF (MTD(f), guessing the
+	# previous iteration's value).
+	#
+	# Returns a (value, move) tuple as for alpha_beta(), and sets "depth" to
+	# the depth of the last completed iteration ("passes" counts MTD(f)
+	# passes over all the iterations).
+	def iterative_deepening(self, state, maxDepth=MAX_PLY, driver=ALPHA_BETA):
+		self.start(state, self.table, self.ordering, driver == self.PVS)
+		started = time.time()
+		# The first iteration always runs to completion, so there's a move
+		result = self.root(state, 1, -INFINITY, INFINITY, True)
+		self.depth = 1
+		self.deadline = state.get_deadline()
+		self.abortable = True
+		# An aborted search leaves moves made on "state", so keep a copy to
+		#  put it back from
+		saved = state.make_copy()
+		try:
+			for depth in range(2, maxDepth + 1):
+				# Stop if the result can't change or there's no time for more
+				if result[1] == None or abs(result[0]) >= WIN - MAX_PLY \
+						or self.known_result(state, result) \
+						or out_of_expansions(state):
+					break
+				if self.deadline != None and time.time() - started \
+						>= (self.deadline - started) / 2:
+					break
+				self.rootBest = None
+				try:
+					if driver == self.PVS:
+						result = self.aspiration(state, depth, result[0])
+					elif driver == self.MTDF:
+						result = self.converge(state, depth, result[0])
+					else:
+						result = self.root(state, depth, -INFINITY, INFINITY, \
+								True)
+					self.depth = depth
+				except SearchAborted:
+					saved.copy_into(state)
+					if self.rootBest != None:
+						result = self.rootBest
+					break
+		finally:
+			self.abortable = False
+			self.deadline = None
+		return self.finish(state, result)
+	
+	# Returns True if the endgame database settles "result", a (value, move)
+	# tuple for "state": it knows how "state" comes out, "result" agrees, and
+	# the move leads to the end of the game or a position it knows too, so
+	# searching deeper can't change either.  (A drawn root's value isn't a win
+	# or loss, so iterative_deepening() needs this to stop early.)
+	def known_result(self, state, result):
+		known = self.known_value(state, 0)
+		if known == None or cmp(result[0], 0) != cmp(known, 0):
+			return False
+		token = self.play(state, result[1])
+		try:
+			if token[3]:
+				return False
+			return state.terminal_status()[0] \
+					or self.known_value(state, 1) != None
+		finally:
+			self.take_back(state, token)
+	
+	# Searches "depth" plies ahead of "state" in a window around "guess" (the
+	# value expected), widening the window on whichever side the value falls
+	# out of until it doesn't.  Returns a (value, move) tuple.
+	def aspiration(self, state, depth, guess):
+		below = above = self.window
+		a = guess - below
+		b = guess + above
+		while True:
+			value, move = self.root(state, depth, a, b, True)
+			if value <= a and a > -INFINITY:
+				# Failed low: widen downwards, giving up on a window after a
+				#  few tries
+				below *= 4
+				a = guess - below if below < self.window * 64 else -INFINITY
+			elif value >= b and b < INFINITY:
+				above *= 4
+				b = guess + above if above < self.window * 64 else INFINITY
+			else:
+				return (value, move)
+	
+	# Finds the value of "state", "depth" plies ahead, by MTD(f) starting from
+	# "guess".  Each pass tests whether the value is above a test value just
+	# below the latest estimate, raising the lower bound or lowering the upper
+	# one, until the two meet.  Returns a (value, move) tuple.
+	def converge(self, state, depth, guess):
+		lower = -INFINITY
+		upper = INFINITY
+		value = guess
+		move = None
+		while lower < upper:
+			test = max(value - self.window, lower)
+			value, found = self.root(state, depth, test, test, True)
+			self.passes += 1
+			if value > test:
+				lower = value
+				# Only a pass which fails high proves its move is best
+				move = found
+			elif value < test:
+				upper = value
+				if move == None:
+					move = found
+			else:
+				# A value exactly at the test value is exact
+				lower = upper = value
+				move = found
+			if out_of_expansions(state):
+				break
+		return (value, move)
+	
+	# Raises SearchAborted if the search may stop early and has run out of
+	# time.  Checks the clock only every so often, since that's not free.
+	def check_time(self):
+		if self.abortable and self.deadline != None and self.nodes & 63 == 0 \
+				and time.time() >= self.deadline:
+			raise SearchAborted()
+	
+	# Returns the value to use for a position the search can't expand any
+	# further this turn (unless it may stop early, in which case it does)
+	def cut_off(self, state):
+		if self.abortable:
+			raise SearchAborted()
+		return self.static_value(state)
+	
+	# Gets ready for a new search of "state", using the transposition table
+	# "table" and move ordering "ordering" (either may be None).  "variation"
+	# is True for a principal variation search; "quiesce" is False to search
+	# without quiescence search even if it's on.
+	def start(self, state, table, ordering, variation=False, quiesce=True):
+		self.nodes = 0
+		self.passes = 0
+		self.variation = variation
+		if state.repeats():
+			history = state.repeat_history()
+			self.seen = set(history) if history != None else set()
+		else:
+			self.seen = None
+		count = state.expansions_count()
+		if self.quiescence <= 0 or not quiesce:
+			self.quiescenceLeft = 0
+		elif count == None:
+			self.quiescenceLeft = None
+		else:
+			self.quiescenceLeft = int(count * self.quiescence)
+		
+		# Keep what earlier searches learned only if asked to, and the game
+		#  hasn't started over since -- or if this is the position pondered.
+		#  Pondering on another position leaves the tables as good as they
+		#  were.
+		epoch = state.get_epoch()
+		fresh = not self.keep or epoch == None or epoch != self.epoch
+		self.ponderHit = False
+		if self.pondered != None:
+			self.ponderHit = self.pondered == state.hash_key()
+			if self.ponderHit:
+				fresh = False
+			self.pondered = None
+		self.epoch = epoch
+		self.rootHint = None
+		if not fresh and self.expected != None \
+				and self.expected[0] == state.hash_key():
+			self.rootHint = self.expected[1]
+		self.expected = None
+		# A ponder hit carries on with the search of the same root, so the
+		#  table's entries and the killers stay as that search left them
+		self.active = table
+		if table != None:
+			if fresh:
+				table.clear()
+			elif not self.ponderHit:
+				table.new_search()
+		self.sorter = ordering
+		if ordering != None:
+			if fresh:
+				ordering.clear()
+			elif not self.ponderHit:
+				ordering.age()
+	
+	# Notes the principal variation of the search of "state" which returned
+	# "result" (a (value, move) tuple), and what it expects to happen next
+	# turn.  Returns "result".
+	def finish(self, state, result):
+		move = result[1]
+		self.pv = []
+		if move != None:
+			record = state.make_move(move)
+			self.pv = [move] + self.principal_variation(state)
+			state.unmove(record)
+		if len(self.pv) >= 3:
+			records = [state.make_move(m) for m in self.pv[:2]]
+			self.expected = (state.hash_key(), self.pv[2])
+			for record in reversed(records):
+				state.unmove(record)
+		return result
+	
+	# Returns the list of moves the transposition table expects both players
+	# to make from "state" (the best move stored for it, then for the
+	# position after that, and so on), at most "length" of them.  Stops at a
+	# position repeating one earlier in the list.
+	def principal_variation(self, state, length=MAX_PLY):
+		moves = []
+		records = []
+		seen = set()
+		while len(moves) < length:
+			entry = self.probe(state)
+			key = state.hash_key()
+			if entry == None or entry[4] == None or key in seen \
+					or not state.is_valid_move(entry[4]):
+				break
+			seen.add(key)
+			moves.append(entry[4])
+			records.append(state.make_move(entry[4]))
+		for record in reversed(records):
+			state.unmove(record)
+		return moves
+	
+	# Returns the list of moves to search from "state", in the order to search
+	# them, or None if the controller refuses the expansion.
+	#
+	# "best" is a move to try first (e.g., from the transposition table), or
+	# None; "ply" is how many plies below the root "state" is.
+	def ordered_moves(self, state, best, ply):
+		moves = state.successor_moves()
+		if moves != None and self.sorter != None:
+			self.sorter.order(state, moves, best, ply)
+			return moves
+		if moves == None or best == None or best not in moves:
+			return moves
+		moves.remove(best)
+		moves.insert(0, best)
+		return moves
+	
+	# Looks the position up in the transposition table.  Returns the entry, or
+	# None if there's no table or no entry.
+	def probe(self, state):
+		if self.active == None:
+			return None
+		key = state.hash_key()
+		if key == None:
+			return None
+		return self.active.probe(key)
+	
+	# Records the result of searching "state" in the transposition table, if
+	# there is one.
+	#
+	# "best" was the result of a search of "depth" plies at "ply" plies below
+	# the root, with the window "a0", "b"; "move" is the best move found.
+	# Results from a search which ran out of expansions part way through
+	# aren't stored, since they don't really come from "depth" plies.
+	def record(self, state, depth, ply, a0, b, best, move):
+		if self.active == None or out_of_expansions(state):
+			return
+		key = state.hash_key()
+		if key == None:
+			return
+		if best <= a0:
+			bound = game_table.TranspositionTable.UPPER
+		elif best >= b:
+			bound = game_table.TranspositionTable.LOWER
+		else:
+			bound = game_table.TranspositionTable.EXACT
+		self.active.store(key, depth, bound, value_to_table(best, ply), move)
+	
+	# Returns the value of "state" at the search horizon, "ply" plies below
+	# the root, from the point of view of the player to move.  That's the
+	# static value, unless quiescence search is on and the position isn't
+	# quiet, in which case the tactical moves are searched (at most "left"
+	# plies deeper) and the player may take the best of them or stand pat.
+	#
+	# a,b are alpha, beta values.
+	def quiesce(self, state, a, b, ply, left):
+		known = self.known_value(state, ply)
+		if known != None:
+			return known
+		stand = self.static_value(state)
+		if stand >= b and stand > a or left <= 0 or self.quiescenceLeft == 0 \
+				or state.is_quiet():
+			return stand
+		moves = state.successor_moves()
+		if moves == None:
+			return stand
+		if self.quiescenceLeft != None:
+			self.quiescenceLeft -= 1
+		
+		best = stand
+		a = max(a, stand)
+		for move in moves:
+			if not state.is_tactical(move):
+				continue
+			token = self.play(state, move)
+			self.nodes += 1
+			over, winner = state.terminal_status()
+			if token[3]:
+				value = -self.cycle_value(state, ply + 1)
+			elif over:
+				value = -self.terminal_value(state, winner, ply + 1)
+			else:
+				value = -self.quiesce(state, -b, -a, ply + 1, left - 1)
+			self.take_back(state, token)
+			if value > best:
+				best = value
+				if best > a:
+					a = best
+					if a >= b:
+						break
+		return best
+	
+	# Tells the move ordering (if any) that "move" caused a cutoff in "state"
+	def note_cutoff(self, state, move, depth, ply):
+		if self.sorter != None:
+			self.sorter.cutoff(state, move, depth, ply)
+	
+	# Makes "move" on "state" for the search, keeping track of the positions
+	# the line may not repeat.  Returns a token to hand to take_back(), whose
+	# last element is True if the move completes a cycle.
+	def play(self, state, move):
+		if self.seen == None:
+			return (state.make_move(move), None, None, False)
+		saved = None
+		if state.clears_repeats(move):
+			saved = self.seen
+			self.seen = set()
+		record = state.make_move(move)
+		key = state.repeated_rep()
+		if key in self.seen:
+			return (record, saved, None, True)
+		self.seen.add(key)
+		return (record, saved, key, False)
+	
+	# Undoes a move made by play(), which returned "token"
+	def take_back(self, state, token):
+		record, saved, key, cycle = token
+		state.unmove(record)
+		if key != None:
+			self.seen.remove(key)
+		if saved != None:
+			self.seen = saved
+	
+	# Returns the value of "state", which repeats an earlier position, from the
+	# point of view of the player to move, "ply" plies from the root: the
+	# value of what handle_cycle() leaves (usually the end of the game).
+	def cycle_value(self, state, ply):
+		final = state.make_copy()
+		final.handle_cycle()
+		over, winner = final.terminal_status()
+		if over:
+			return self.terminal_value(final, winner, ply)
+		return self.static_value(final)
+	
+	# Makes "move" on "state" and returns the value of the position it leads
+	# to, as child_value() does, unless the move completes a cycle.
+	def search_move(self, state, move, depth, a, b, ply, prune, first):
+		token = self.play(state, move)
+		if token[3]:
+			self.nodes += 1
+			value = -self.cycle_value(state, ply)
+		else:
+			value = self.child_value(state, depth, a, b, ply, prune, first)
+		self.take_back(state, token)
+		return value
+	
+	# Searches the position "state" reached by a move, "depth" plies ahead and
+	# "ply" plies below the root, and returns its value from the point of view
+	# of the player who made the move.  a,b are the window at the parent.
+	#
+	# In a principal variation search, moves after the "first" are tried with
+	# a null window at "a", and searched properly only if they beat it.
+	def child_value(self, state, depth, a, b, ply, prune, first):
+		if first or not self.variation:
+			return -self.negamax(state, depth, -b, -a, ply, prune)
+		value = -self.negamax(state, depth, -a, -a, ply, prune)
+		if a < value < b:
+			value = -self.negamax(state, depth, -b, -a, ply, prune)
+		return value
+	
+	# Searches the children of the root and keeps track of the best move,
+	# which the inner search doesn't need to.
+	#
+	# a,b are alpha, beta values; "prune" is False to search every child.
+	def root(self, state, depth, a, b, prune):
+		self.nodes += 1
+		over, winner = state.terminal_status()
+		if over:
+			return (self.terminal_value(state, winner, 0), None)
+		if depth <= 0:
+			return (self.quiesce(state, a, b, 0, QUIESCENCE_PLY), None)
+		if out_of_expansions(state):
+			return (self.cut_off(state), None)
+		entry = self.probe(state)
+		hint = entry[4] if entry != None else self.rootHint
+		moves = self.ordered_moves(state, hint, 0)
+		if moves == None:
+			return (self.cut_off(state), None)
+		
+		a0 = a
+		best = -INFINITY
+		bestMove = None
+		for move in moves:
+			value = self.search_move(state, move, depth - 1, a, b, 1, prune, \
+					bestMove == None)
+			if value > best:
+				best = value
+				bestMove = move
+				if best > a:
+					# Only a value inside the window is worth keeping if the
+					#  search is cut short (see iterative_deepening())
+					self.rootBest = (best, bestMove)
+					a = best
+					if prune and a >= b:
+						self.note_cutoff(state, move, depth, 0)
+						break
+		self.record(state, depth, 0, a0, b, best, bestMove)
+		return (best, bestMove)
+	
+	# The recursive part of the search.  Returns the value of "state", from
+	# the point of view of the player to move, "depth" plies ahead, "ply"
+	# plies below the root.
+	#
+	# a,b are alpha, beta values; "prune" is False to search every child.
+	def negamax(self, state, depth, a, b, ply, prune):
+		self.nodes += 1
+		over, winner = state.terminal_status()
+		if over:
+			return self.terminal_value(state, winner, ply)
+		if depth <= 0:
+			return self.quiesce(state, a, b, ply, QUIESCENCE_PLY)
+		known = self.known_value(state, ply)
+		if known != None:
+			return known
+		if out_of_expansions(state):
+			return self.cut_off(state)
+		self.check_time()
+		
+		# A deep enough result from the transposition table may settle the
+		#  position, or at least narrow the window
+		entry = self.probe(state)
+		hint = None
+		if entry != None:
+			hint = entry[4]
+			if entry[1] >= depth:
+				value = value_from_table(entry[3], ply)
+				bound = entry[2]
+				if bound == game_table.TranspositionTable.EXACT:
+					return value
+				# (A bound exactly at a null window's edge would be taken for
+				#  an exact value, so it's no good there)
+				if bound == game_table.TranspositionTable.LOWER:
+					if value >= b and value > a:
+						return value
+					a = max(a, value)
+				else:
+					if value <= a and value < b:
+						return value
+					b = min(b, value)
+		
+		moves = self.ordered_moves(state, hint, ply)
+		if moves == None:
+			return self.cut_off(state)
+		
+		a0 = a
+		best = -INFINITY
+		bestMove = None
+		for move in moves:
+			value = self.search_move(state, move, depth - 1, a, b, ply + 1, \
+					prune, bestMove == None)
+			if value > best:
+				best = value
+				bestMove = move
+				if best > a:
+					a = best
+					if prune and a >= b:
+						self.note_cutoff(state, move, depth, ply)
+						break
+		self.record(state, depth, ply, a0, b, best, bestMove)
+		return best
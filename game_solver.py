@@ -0,0 +1,267 @@
+import game_book
+
+# An exact solver for small games, which works on any GameState subclass.
+#
+# GameSolver plays every line out to the end of the game, depth first, and
+# remembers the result of every position it solves (by hash_key(), or
+# repeated_rep() for games without one), so each position is only solved
+# once however many ways it can be reached, and later calls on the same
+# solver reuse everything earlier ones found.  Positions are remembered by
+# their canonical keys (see GameState.canonical_key()), so one entry serves
+# every position equivalent by a symmetry of the game.  Results are exact:
+# WIN, DRAW or LOSS for the player to move, with a move which achieves it.
+#
+# Expansion limits don't apply: the solver works on a copy of the state with
+# no controller.  It is meant for games (or parts of games) small enough to
+# solve outright -- tic-tac-toe, say, or Oware endgames -- and for checking
+# heuristic players against.
+#
+# In games which cycle, a line ends when it repeats a position played since
+# the repeated-state history was last cleared, scored as handle_cycle() leaves
+# the game, just as GameSearch does.  The result of a position can depend on
+# that history then, but only if a line which decided it was cut short by a
+# repeat before the history was next cleared.  Results which weren't are
+# remembered by position alone, and hold however the position is reached.
+# The others are remembered only for positions whose history is just
+# themselves -- those a capture leads to, or whatever else clears the history
+# (GameState.clears_repeats()) -- and otherwise solved again each time, as
+# they seldom come up again with the same history.  (This is the
+# graph-history interaction problem of game-tree search.)  A position whose
+# history holds earlier positions too is solved with tables of its own, as
+# the solver can't tell which results those positions would change.
+#
+# export() saves the solved positions in the opening book format (see
+# game_book.py), so that any player can look them up with an OpeningBook.
+# Books find positions by canonical key, as the solver keeps them.  In games
+# which cycle, it saves the results which hold however the position is
+# reached.
+class GameSolver(object):
+	# Results, from the point of view of the player to move
+	WIN = 1
+	DRAW = 0
+	LOSS = -1
+	
+	def __init__(self):
+		# Maps entry_key()s to (result, move index) pairs, the index being
+		#  into the successor_moves() of the position the key is for (the
+		#  canonical one, when the key is a canonical key).  In games which
+		#  cycle, just the results which hold whatever the history.
+		self.table = {}
+		# Likewise, for the other results in games which cycle, which hold
+		#  when the history is just the position itself
+		self.fresh = {}
+		# Number of positions visited by the last solve()
+		self.nodes = 0
+		# The repeated_rep() values the current line may not repeat, or None
+		#  if the game doesn't cycle
+		self.seen = None
+		# Maps the entry_key()s of the positions on the current line to how
+		#  many of them have each
+		self.line = {}
+		# True if positions are remembered by their own keys, not canonical
+		#  ones (see solve())
+		self.own = False
+	
+	# Returns the key "state" is remembered by
+	def key(self, state):
+		key = state.hash_key()
+		if key == None:
+			return state.repeated_rep()
+		return key
+	
+	# Returns the result of a finished game won by "winner" (None for a draw)
+	# for the player to move in "state"
+	def final_result(self, state, winner):
+		if winner == None:
+			return GameSolver.DRAW
+		if winner == state.get_next_player():
+			return GameSolver.WIN
+		return GameSolver.LOSS
+	
+	# Solves "state".  Returns a (result, move) tuple: WIN, DRAW or LOSS for the
+	# player to move with best play, and a move which achieves it (None if the
+	# game is already over).
+	def solve(self, state):
+		self.nodes = 0
+		tables = None
+		if state.repeats():
+			history = state.repeat_history()
+			if history == None:
+				history = [state.repeated_rep()]
+			self.seen = set(history)
+			if len(self.seen - set([state.repeated_rep()])) > 0:
+				# Results remembered so far may have been decided by lines
+				#  through the earlier positions, which repeat here; nor can the
+				#  search tell positions equivalent to them, so it keeps to
+				#  positions' own keys
+				tables = (self.table, self.fresh)
+				self.table = {}
+				self.fresh = {}
+				self.own = True
+		else:
+			self.seen = None
+		state = state.make_copy()
+		state.setController(None, False)
+		try:
+			result, index, cut = self.search(state)
+		finally:
+			if tables != None:
+				self.table, self.fresh = tables
+				self.own = False
+		if index == None:
+			return (result, None)
+		return (result, state.successor_moves()[index])
+	
+	# Returns the result solve() would give for "state"
+	def result(self, state):
+		return self.solve(state)[0]
+	
+	# Returns a (key, symmetry) tuple: the key the result of "state" is
+	# remembered by -- its canonical key, unless the solver keeps to positions'
+	# own keys -- and the symmetry which turns "state" into the position the
+	# key is for
+	def entry(self, state):
+		if self.own:
+			return (self.key(state), 0)
+		key, symmetry = state.canonical_key()
+		if key == None:
+			return (state.repeated_rep(), 0)
+		return (key, symmetry)
+	
+	# Returns the key the result of "state" is remembered by (see entry())
+	def entry_key(self, state):
+		return self.entry(state)[0]
+	
+	# Returns the index, among the successor_moves() of
+	# state.transformed(symmetry), of the move at "index" among those of
+	# "state", or the other way round if "back" is True
+	def map_index(self, state, index, symmetry, back=False):
+		if symmetry == 0 or index == None:
+			return index
+		moves = state.successor_moves()
+		images = state.transformed(symmetry).successor_moves()
+		if back:
+			return moves.index(state.untransform_move(images[index], symmetry))
+		return images.index(state.transform_move(moves[index], symmetry))
+	
+	# Solves "state", which has no controller.  Returns a (result, move index,
+	# cut) tuple, cut being True if the result depends on the history (a line
+	# which decided it was cut short by a repeat before the history was
+	# cleared).
+	#
+	# A result which doesn't depend on the history is remembered by position
+	# alone, and holds wherever the position is reached: the positions on the
+	# lines which decided it were remembered too, so none of them can have
+	# been searched (rather than looked up) on the way to it, and none can be
+	# a repeat.  That holds for equivalent positions too, as long as none is
+	# remembered while one equivalent to it is on the line.
+	def search(self, state):
+		self.nodes += 1
+		over, winner = state.terminal_status()
+		if over:
+			return (self.final_result(state, winner), None, False)
+		key, symmetry = self.entry(state)
+		entry = self.table.get(key)
+		if entry != None:
+			return (entry[0], self.map_index(state, entry[1], symmetry, True), \
+					False)
+		fresh = self.seen != None and len(self.seen) == 1 \
+				and state.repeated_rep() in self.seen
+		if fresh:
+			entry = self.fresh.get(key)
+			if entry != None:
+				return (entry[0], \
+						self.map_index(state, entry[1], symmetry, True), True)
+		
+		# While a position equivalent to this one is further up the line, the
+		#  result is kept to this history (see above)
+		shared = False
+		if self.seen != None:
+			count = self.line.get(key, 0)
+			self.line[key] = count + 1
+			shared = count > 0
+		cut = shared
+		best = None
+		bestIndex = None
+		for index, move in enumerate(state.successor_moves()):
+			saved = None
+			if self.seen != None and state.clears_repeats(move):
+				saved = self.seen
+				self.seen = set()
+			record = state.make_move(move)
+			rep = None
+			moveCut = False
+			if self.seen == None:
+				result = -self.search(state)[0]
+			else:
+				rep = state.repeated_rep()
+				if rep in self.seen:
+					rep = None
+					result = -self.cycle_result(state)
+					moveCut = True
+				else:
+					self.seen.add(rep)
+					result, childIndex, moveCut = self.search(state)
+					result = -result
+					self.seen.remove(rep)
+					# The history starts afresh after a move which clears it
+					if saved != None:
+						moveCut = False
+			state.unmove(record)
+			if saved != None:
+				self.seen = saved
+			cut = cut or moveCut
+			
+			if best == None or result > best:
+				best = result
+				bestIndex = index
+				if best == GameSolver.WIN:
+					# A win holds as long as the winning line does
+					cut = shared or moveCut
+					break
+		
+		if self.seen != None:
+			if count == 0:
+				del self.line[key]
+			else:
+				self.line[key] = count
+		entry = (best, self.map_index(state, bestIndex, symmetry))
+		if not cut:
+			self.table[key] = entry
+		elif fresh:
+			self.fresh[key] = entry
+		return (best, bestIndex, cut)
+	
+	# Returns the result, for the player to move, of "state", which repeats an
+	# earlier position: the result of what handle_cycle() leaves
+	def cycle_result(self, state):
+		final = state.make_copy()
+		final.handle_cycle()
+		over, winner = final.terminal_status()
+		if over:
+			return self.final_result(final, winner)
+		return self.search(final)[0]
+	
+	# Forgets every position solved
+	def clear(self):
+		self.table = {}
+		self.fresh = {}
+	
+	# Writes the solved positions to the file "fname" in the opening book format
+	# (see game_book.py), with the result as the value.  The game's hash_key()
+	# must be implemented.
+	#
+	# The table is keyed by canonical key, with move indices among the
+	# successor_moves() of the canonical position (see search()), just as
+	# OpeningBook.lookup() expects; results kept by positions' own keys, or
+	# only for one history, are left out.
+	def export(self, fname):
+		records = []
+		for key, (result, index) in self.table.items():
+			records.append((key, index, result))
+		records.sort()
+		fout = open(fname, 'wb')
+		fout.write(game_book.MAGIC)
+		for key, index, result in records:
+			fout.write(game_book.RECORD.pack(key, index, result))
+		fout.close()
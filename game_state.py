@@ -1,17 +1,44 @@
 import copy
+import random
 import weakref
 
+# Returns a list of "count" random 64-bit integers for Zobrist hashing (see
+# GameState.hash_key()).  The numbers depend only on "seed", so keys come out
+# the same on every run and may be stored on disk.
+def zobrist_keys(count, seed):
+	r = random.Random(seed)
+	return [r.getrandbits(64) for i in range(count)]
+
 # A class to represent one move to be made in the game
 # Has to represent both what the move is and and the player making it
 # Allows the player to give up by setting is_forfeit() True
 #
 # Intended to be subclassed for a specific game type
 # Override all methods in subclass
-class GameMove:
+#
+# Moves compare equal (and hash alike) when they are the same kind of move by
+# the same player to the same place, so they can be used as dictionary keys,
+# e.g. in killer-move or history tables.  Games with few distinct moves should
+# hand out shared, immutable instances (see OwareMove.of()) so that comparing
+# them is usually just an identity check.
+class GameMove(object):
+	__slots__ = ()
+	
 	# Returns an informal string representation (used to print out the move
 	#  during gameplay)
 	def __str__(self):
 		return "Base GameMove object"
+	def __eq__(self, other):
+		if self is other:
+			return True
+		return type(self) is type(other) \
+			and self.get_player() == other.get_player() \
+			and self.get_move() == other.get_move() \
+			and self.is_forfeit() == other.is_forfeit()
+	def __ne__(self, other):
+		return not self.__eq__(other)
+	def __hash__(self):
+		return hash((self.get_player(), self.get_move(), self.is_forfeit()))
 	# Returns the player whose move this is
 	#  return val is an object whose type is a game-specific subclass of
 	#  GamePlayer
@@ -48,7 +75,23 @@ class GameMove:
 #   move()
 #	handle_cycle()
 #   successor_moves()
-class GameState:
+#   hash_key()
+# and, optionally (the defaults work, but slowly):
+#   make_move()
+#   unmove()
+#   has_legal_moves()
+# and, if the game has symmetries (the defaults treat every position as
+# unlike any other):
+#   canonical_key()
+#   transformed()
+#   transform_move()
+#   untransform_move()
+#
+# Subclasses may declare __slots__ of their own to keep per-state memory down
+# (see OwareState); the base class only holds the controller reference.
+class GameState(object):
+	__slots__ = ('controller',)
+	
 	def __init__(self):
 		self.controller = None
 	
@@ -59,6 +102,10 @@ class GameState:
 	# Having this reference allows us to check legality of certain actions with
 	# the controller (like how many times the player is allowed to ask us about
 	# successor states)
+	#
+	# The states handed to players during their turn point at a SearchContext
+	# (see game_context.py) instead, which answers the same calls without
+	# going back to the controller; that one is set with proxy=False.
 	def setController(self, controller, proxy=True):
 		if proxy:
 			self.controller = weakref.proxy(controller)
@@ -84,6 +131,68 @@ class GameState:
 	def repeated_rep(self):
 		pass
 	
+	# Override in subclass ONLY if game has cycles
+	#
+	# Returns True if making the indicated move (valid on this state) clears
+	# the repeated-state history, as move() does (with clearRepeats) when
+	# the move makes earlier positions impossible to reach again.  Searches
+	# use this to know which positions can still repeat.
+	#
+	# move is an object whose type is a game-specific subclass of GameMove
+	def clears_repeats(self, move):
+		return False
+	
+	# Override in subclass
+	#
+	# Returns an integer key for the position (board and player to move), for
+	# use in transposition tables, evaluation caches and the like.  Equal
+	# positions must give equal keys, and different positions should almost
+	# never collide.  Games should maintain the key incrementally (e.g., with
+	# Zobrist hashing, see zobrist_keys()) so that asking for it is O(1).
+	def hash_key(self):
+		pass
+	
+	# Override in subclass ONLY if the game has symmetries
+	#
+	# A symmetry turns a position into an equivalent one: the same game, up to
+	# how the board is drawn or which player is called which.  Symmetries are
+	# numbered from 0, the identity, and must keep the player to move the one
+	# to move, so that a result or value from the point of view of the player
+	# to move is the same for every position in a class.  Tables keyed by the
+	# canonical key need only one entry per class.
+	#
+	# Returns a (key, symmetry) tuple: "key" is the least hash_key() of the
+	# positions equivalent to this one, and "symmetry" is a symmetry which
+	# turns this position into the one with that key (see transformed()).
+	def canonical_key(self):
+		return (self.hash_key(), 0)
+	
+	# Override in subclass ONLY if the game has symmetries
+	#
+	# Returns a copy of this state turned into an equivalent position by
+	# "symmetry" (see canonical_key()).  The copy has this state's controller,
+	# but isn't the position the controller is playing.
+	def transformed(self, symmetry):
+		return self.make_copy()
+	
+	# Override in subclass ONLY if the game has symmetries
+	#
+	# Returns the move which "move" (valid on this state) becomes on
+	# transformed(symmetry)
+	#
+	# move is an object whose type is a game-specific subclass of GameMove
+	def transform_move(self, move, symmetry):
+		return move
+	
+	# Override in subclass ONLY if the game has symmetries
+	#
+	# The reverse of transform_move(): returns the move on this state which
+	# "move" (valid on transformed(symmetry)) is the image of
+	#
+	# move is an object whose type is a game-specific subclass of GameMove
+	def untransform_move(self, move, symmetry):
+		return move
+	
 	# Override in subclass
 	# Be sure to call this super method to get the controller!
 	#
@@ -112,6 +221,20 @@ class GameState:
 	def clear(self):
 		pass
 	
+	# Override in subclass
+	#
+	# Returns a one-line string describing the position (board and player to
+	# move), in a form which load_position() accepts
+	def position_string(self):
+		pass
+	
+	# Override in subclass
+	#
+	# Sets this state to the position described by "text" (as returned by
+	# position_string()).  Raises ValueError if "text" can't be understood.
+	def load_position(self, text):
+		raise ValueError("Positions can't be loaded for this game")
+	
 	# Override in subclass
 	#
 	# returns True if indicated player has won, False else
@@ -160,6 +283,64 @@ class GameState:
 	def move(self, move, clearRepeats=False):
 		pass
 	
+	# Override in subclass for speed
+	#
+	# Like move(), but instead of the next player, returns an undo record
+	# which can be handed to unmove() to put this state back the way it was
+	# before the move.  Returns None (and leaves the state alone) if the move
+	# is invalid.
+	#
+	# This lets a depth-first search play out a whole line on one state object
+	# instead of copying the state at every node.  Expansions are still
+	# counted by successor_moves(), so the controller's limit applies as usual.
+	#
+	# The default record is just a full copy of the state.
+	#
+	# move is an object whose type is a game-specific subclass of GameMove
+	def make_move(self, move):
+		record = self.make_copy()
+		if self.move(move) == None:
+			return None
+		return record
+	
+	# Override in subclass if make_move() is overridden
+	#
+	# Undoes the move that produced "record" (returned by make_move()).  Moves
+	# must be undone in the reverse of the order they were made.
+	def unmove(self, record):
+		record.copy_into(self)
+	
+	# Override in subclass for better move ordering
+	#
+	# Returns True if the indicated move (valid on this state) captures
+	# something, False else.  Searches try captures early (see
+	# game_ordering.py), so this should be cheap; it needn't be exact.
+	#
+	# move is an object whose type is a game-specific subclass of GameMove
+	def is_capture(self, move):
+		return False
+	
+	# Override in subclass to enable quiescence search
+	#
+	# Returns True if this position is quiet: the player to move has no
+	# capture or other tactical move which a static evaluation is likely to
+	# misjudge.  Quiescence search (see game_search.py) only looks past the
+	# horizon from positions which aren't quiet.  Unlike successor_moves(),
+	# this doesn't count as an expansion, so it should be cheap.
+	#
+	# The default treats every position as quiet.
+	def is_quiet(self):
+		return True
+	
+	# Override in subclass to enable quiescence search
+	#
+	# Returns True if the indicated move (valid on this state) is one that
+	# quiescence search should play out.  The default is captures.
+	#
+	# move is an object whose type is a game-specific subclass of GameMove
+	def is_tactical(self, move):
+		return self.is_capture(move)
+	
 	# Override in subclass ONLY if the game can cycle.
 	#
 	# Responsible for handling a cycle situation (e.g., by declaring a draw,
@@ -167,6 +348,37 @@ class GameState:
 	def handle_cycle(self):
 		pass
 	
+	# Override in subclass for speed
+	#
+	# Returns True if the player to move has at least one legal move, False
+	# else.  Unlike successor_moves(), this doesn't count as an expansion.
+	#
+	# The default asks successor_moves() with the controller out of the way.
+	def has_legal_moves(self):
+		controller = self.controller
+		self.controller = None
+		try:
+			return len(self.successor_moves()) > 0
+		finally:
+			self.controller = controller
+	
+	# Returns a (over, winner) tuple: over is True if the game has ended in
+	# this state, and winner is then the game ID of the winning player, or None
+	# for a draw.  If play goes on, returns (False, None).
+	#
+	# Follows the GameController's rules: the game is won by a player who just
+	# moved into a winning state (is_win()), and is over otherwise when the
+	# player to move has no legal moves.  Doesn't count as an expansion, so
+	# searches can use it freely.
+	def terminal_status(self):
+		player = self.get_next_player()
+		for other in self.get_players():
+			if other != player and self.is_win(other):
+				return (True, other)
+		if not self.has_legal_moves():
+			return (True, None)
+		return (False, None)
+	
 	# returns # of expansions the controller will allow for the remainder
 	# of the turn
 	def expansions_count(self):
@@ -175,6 +387,32 @@ class GameState:
 		else:
 			return self.controller.expansions_count()
 		
+	# returns the time (as from time.time()) by which the player searching
+	# this state should move, or None if there is no time limit
+	def get_deadline(self):
+		if self.controller == None:
+			return None
+		else:
+			return self.controller.get_deadline()
+	
+	# returns the set of repeated_rep() values of the positions played since
+	# the repeated-state history was last cleared (a position repeating one
+	# of them is a cycle, see handle_cycle()), or None if this state has no
+	# controller or the game doesn't cycle
+	def repeat_history(self):
+		if self.controller == None:
+			return None
+		else:
+			return self.controller.repeat_history()
+	
+	# returns a number which changes whenever the game is reset (see
+	# GameController.get_epoch()), or None if this state has no controller
+	def get_epoch(self):
+		if self.controller == None:
+			return None
+		else:
+			return self.controller.get_epoch()
+	
 	# Override in subclass
 	# be sure to call this super function and return None if it returns None
 	# override should return empty list if no moves are possible
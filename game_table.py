@@ -0,0 +1,93 @@
+# A transposition table: a fixed-size cache of search results, keyed by
+# GameState.hash_key(), so that a search which reaches the same position again
+# (by a different order of moves, say) can reuse what it found there instead
+# of searching it again.
+#
+# The table has a fixed number of buckets and never grows.  Each bucket holds
+# two entries: one which is only replaced by results from a search at least as
+# deep (so expensive results survive), and one which is always replaced (so
+# recent results get in too).
+#
+# A table may be kept from one search to the next (say, from turn to turn):
+# call new_search() at the start of each.  Entries left from earlier searches
+# can still be found, but give way to new results whatever their depth, so
+# old deep results don't fill the table up for good.
+#
+# Each entry is a (key, depth, bound, value, move, search) tuple:
+#   key is the position's full hash key (different positions may share a
+#     bucket, so this is checked on lookup)
+#   depth is how many plies deep the position was searched
+#   bound says what "value" means (see EXACT, LOWER, UPPER below)
+#   value is the search result, from the point of view of the player to move
+#   move is the best move found, or None
+#   search is the number of the search which stored it (see new_search())
+class TranspositionTable(object):
+	# "value" is the exact value of the position
+	EXACT = 0
+	# The position is worth at least "value" (the search failed high)
+	LOWER = 1
+	# The position is worth at most "value" (the search failed low)
+	UPPER = 2
+	
+	# "size" is the number of entries to hold (rounded down to a power of two,
+	# and at least 2).  Each entry costs roughly 100-150 bytes.
+	def __init__(self, size=2**16):
+		buckets = 1
+		while buckets * 4 <= size:
+			buckets *= 2
+		self.mask = buckets - 1
+		self.entries = [None] * (2 * buckets)
+		# Number of the current search
+		self.search = 0
+		# Lookup statistics since the last clear() or new_search()
+		self.probes = 0
+		self.hits = 0
+	
+	# Returns the number of entries the table can hold
+	def capacity(self):
+		return len(self.entries)
+	
+	# Forgets everything in the table
+	def clear(self):
+		self.entries = [None] * len(self.entries)
+		self.search = 0
+		self.probes = 0
+		self.hits = 0
+	
+	# Starts a new search which keeps what the table holds
+	def new_search(self):
+		self.search += 1
+		self.probes = 0
+		self.hits = 0
+	
+	# Returns the entry stored for the position with hash key "key", or None
+	# if there isn't one.
+	def probe(self, key):
+		self.probes += 1
+		i = 2 * (key & self.mask)
+		entry = self.entries[i]
+		if entry != None and entry[0] == key:
+			self.hits += 1
+			return entry
+		entry = self.entries[i+1]
+		if entry != None and entry[0] == key:
+			self.hits += 1
+			return entry
+		return None
+	
+	# Records a search result for the position with hash key "key" (see the
+	# comments on the class for the other arguments)
+	def store(self, key, depth, bound, value, move):
+		i = 2 * (key & self.mask)
+		entry = (key, depth, bound, value, move, self.search)
+		old = self.entries[i]
+		# The depth-preferred entry takes results at least as deep as its own,
+		# anything for the same position, and anything from a later search
+		if old == None or depth >= old[1] or old[0] == key \
+				or old[5] != self.search:
+			# Rather than losing the old result, move it to the other entry
+			if old != None and old[0] != key:
+				self.entries[i+1] = old
+			self.entries[i] = entry
+		else:
+			self.entries[i+1] = entry
@@ -1,9 +1,60 @@
+import operator
+
 import game_state
 import game_player
 
+# Total number of stones in the game
+STONES = 48
+
+# Builds the sowing table used by OwareState.
+#
+# SOWING[pit][stones] is a (delta, dest) pair describing what happens when
+#  "stones" stones are sown from the board pit "pit" (0-11, as in OwareState's
+#  board tuple): "delta" is a 14-tuple which, added element-wise to the board,
+#  gives the board after sowing (the source pit loses its stones, every pit
+#  they land in gains one, the source pit is skipped on each lap and the keeps
+#  are untouched); "dest" is the board pit receiving the last stone.
+def build_sowing_table():
+	table = []
+	for pit in range(12):
+		row = []
+		for stones in range(STONES + 1):
+			delta = [0] * 14
+			delta[pit] = -stones
+			dest = pit
+			left = stones
+			while left > 0:
+				dest = (dest + 1) % 12
+				# Skip the original pit
+				if dest == pit:
+					continue
+				delta[dest] += 1
+				left -= 1
+			row.append((tuple(delta), dest))
+		table.append(row)
+	return table
+
+SOWING = build_sowing_table()
+
+# Zobrist keys for OwareState.hash_key(): ZOBRIST_PITS[pit][stones] for each
+#  board pit, ZOBRIST_KEEPS[keep][2 * stones] for each keep (keeps can hold
+#  half stones after a cycle is split), and ZOBRIST_PLAYER when player 2 is
+#  to move
+ZOBRIST_PITS = [game_state.zobrist_keys(STONES + 1, 1000 + i) \
+					for i in range(12)]
+ZOBRIST_KEEPS = [game_state.zobrist_keys(2*STONES + 1, 2000 + i) \
+					for i in range(2)]
+ZOBRIST_PLAYER = game_state.zobrist_keys(1, 3000)[0]
+
 
 # Subclass of GameMove describing a single move in a game of Oware
+#
+# Moves are immutable.  There are only 12 distinct non-forfeit moves, so
+#  rather than creating new ones, use OwareMove.of() to get the shared
+#  instance.
 class OwareMove(game_state.GameMove):
+	__slots__ = ('player', 'pit', 'forfeit')
+	
 	# Sets the player making the move, the pit being emptied,
 	#  and whether the move is a forfeit on creation
 	#
@@ -12,9 +63,18 @@ class OwareMove(game_state.GameMove):
 	#   0-5 -- see comments on OwareState)
 	# "forfeit" is a boolean, True only if the player wishes to concede
 	def __init__(self, player, pit, forfeit=False):
-		self.player = player
-		self.pit = pit
-		self.forfeit = forfeit
+		object.__setattr__(self, 'player', player)
+		object.__setattr__(self, 'pit', pit)
+		object.__setattr__(self, 'forfeit', forfeit)
+	
+	def __setattr__(self, name, value):
+		raise AttributeError("OwareMove objects are immutable")
+	
+	# Returns the shared move object for the indicated player moving the
+	#  indicated pit (arguments as for the constructor)
+	@classmethod
+	def of(cls, player, pit):
+		return OwareMove.MOVES[player][pit]
 		
 	# Returns an informal string representation for printing
 	def __str__(self):
@@ -34,6 +94,9 @@ class OwareMove(game_state.GameMove):
 	# Returns True if the player gives up, False else
 	def is_forfeit(self):
 		return self.forfeit
+
+# The shared moves handed out by OwareMove.of(), indexed by player, then pit
+OwareMove.MOVES = [None] + [[OwareMove(p, i) for i in range(6)] for p in (1,2)]
 		
 		
 # Subclass of GameState describing a single game state in a game of Oware
@@ -49,7 +112,22 @@ class OwareMove(game_state.GameMove):
 #  before his/her opponent's #0 pit in the counterclockwise distribution cycle.
 #   K 5 4 3 2 1 0		(Player 1)
 #     0 1 2 3 4 5 K		(Player 2)
+#
+# Internally the whole board lives in one immutable tuple, "board": the 12 pits
+#  (player 1's pits 0-5, then player 2's pits 0-5) followed by the two keeps.
+#  Moves replace the tuple rather than modifying it, so copies of a state can
+#  simply share it.
+#
+# "mask" caches legal_move_mask() for the current board and player; anything
+#  which replaces the board or switches the player must reset it to None.
+#  "zobrist" is the hash_key() of the position, kept up to date as the board
+#  changes.
 class OwareState(game_state.GameState):
+	__slots__ = ('board', 'player', 'mask', 'zobrist')
+	
+	# Index of player 1's keep in the board tuple (player 2's follows it)
+	KEEP = 12
+	
 	# On initialization, just clear the board to a starting state
 	def __init__(self):
 		game_state.GameState.__init__(self)
@@ -57,12 +135,22 @@ class OwareState(game_state.GameState):
 	
 	# Return an informal string representation for printing the board
 	def __str__(self):
+		b = self.board
 		return "%2d  %2d %2d %2d %2d %2d %2d\n"\
 				"    %2d %2d %2d %2d %2d %2d  %2d" \
-				% (self.keeps[0], self.pits[5], self.pits[4], self.pits[3], \
-						self.pits[2], self.pits[1], self.pits[0], \
-					self.pits[6], self.pits[7], self.pits[8], self.pits[9], \
-						self.pits[10], self.pits[11], self.keeps[1])
+				% (b[12], b[5], b[4], b[3], b[2], b[1], b[0], \
+					b[6], b[7], b[8], b[9], b[10], b[11], b[13])
+	
+	# The stones in each of the 12 pits, as a tuple indexed as in the board
+	#  diagram above (player 1's pits are 0-5, player 2's are 6-11)
+	@property
+	def pits(self):
+		return self.board[:OwareState.KEEP]
+	
+	# The stones in each player's keep, as a tuple (player 1's keep first)
+	@property
+	def keeps(self):
+		return self.board[OwareState.KEEP:]
 	
 	# Oware has cycles, so let the GameController know that
 	#  repeated-state detection is in effect
@@ -71,35 +159,120 @@ class OwareState(game_state.GameState):
 	
 	# Returns a hashable representation of the state for repeated-state
 	#  detection
+	#
+	# This is the hash key, which also covers the keeps; that's fine since
+	#  the repeated-state history is cleared whenever a capture changes them.
 	def repeated_rep(self):
-		return (self.player, tuple(self.pits))
+		return self.zobrist
+	
+	# Returns the 64-bit Zobrist key of this position
+	def hash_key(self):
+		return self.zobrist
+	
+	# Computes the Zobrist key of this position from scratch (move() keeps
+	#  it up to date incrementally)
+	def zobrist_hash(self):
+		h = ZOBRIST_PLAYER if self.player == 2 else 0
+		for i in range(12):
+			h ^= ZOBRIST_PITS[i][self.board[i]]
+		for i in range(2):
+			h ^= ZOBRIST_KEEPS[i][int(2 * self.board[OwareState.KEEP + i])]
+		return h
+	
+	# Oware looks the same to both players, so besides the identity there is
+	#  one symmetry, 1: turning the board round, which swaps the players' pits,
+	#  their keeps and the player to move.  Returns the smaller of the two
+	#  positions' hash keys and the symmetry giving it.
+	def canonical_key(self):
+		board = self.board
+		h = ZOBRIST_PLAYER if self.player == 1 else 0
+		for i in range(12):
+			h ^= ZOBRIST_PITS[i][board[(i + 6) % 12]]
+		for i in range(2):
+			h ^= ZOBRIST_KEEPS[i][int(2 * board[OwareState.KEEP + 1 - i])]
+		if h < self.zobrist:
+			return (h, 1)
+		return (self.zobrist, 0)
+	
+	# Returns a copy of this state, turned round if "symmetry" is 1 (see
+	#  canonical_key())
+	def transformed(self, symmetry):
+		r = self.make_copy()
+		if symmetry == 1:
+			b = self.board
+			r.board = b[6:12] + b[0:6] + (b[13], b[12])
+			r.player = (self.player % 2) + 1
+			# The legal move mask is by the mover's own pit numbers, so it
+			#  still holds
+			r.zobrist = r.zobrist_hash()
+		return r
+	
+	# Returns the move "move" becomes with the board turned round if
+	#  "symmetry" is 1: the same pit, by the other player
+	def transform_move(self, move, symmetry):
+		if symmetry == 1:
+			return OwareMove.of((move.get_player() % 2) + 1, move.get_move())
+		return move
+	
+	# Turning the board round twice puts it back, so this is transform_move()
+	def untransform_move(self, move, symmetry):
+		return self.transform_move(move, symmetry)
 	
 	# Clears the board to a starting state
 	def clear(self):
-		# The pits are all initially filled with 4 stones
-		self.pits = [4] * 12
-		# The players' keeps are initially empty
-		self.keeps = [0] * 2
+		# The pits are all initially filled with 4 stones, and the players'
+		#  keeps are initially empty
+		self.board = (4,) * 12 + (0, 0)
 		# Player 1 goes first
 		self.player = 1
+		self.mask = None
+		self.zobrist = self.zobrist_hash()
 		# If the controller has been initialized, restart its repeated-state
 		#  detection
 		if self.controller != None:
 			self.controller.clear_repeat()
 	
+	# Returns the position as a string of 15 numbers: the 12 pits (in board
+	#  tuple order), the two keeps, and the player to move
+	def position_string(self):
+		return " ".join([str(x) for x in self.board + (self.player,)])
+	
+	# Sets the board and player to move from a position string (see
+	#  position_string())
+	def load_position(self, text):
+		values = text.split()
+		if len(values) != 15:
+			raise ValueError("Expected 12 pits, 2 keeps and a player in %s" \
+				% repr(text))
+		pits = [int(x) for x in values[:12]]
+		keeps = [float(x) if '.' in x else int(x) for x in values[12:14]]
+		player = int(values[14])
+		if player not in self.get_players() or min(pits) < 0 \
+				or sum(pits) + sum(keeps) != STONES:
+			raise ValueError("Not a valid Oware position: %s" % repr(text))
+		self.board = tuple(pits + keeps)
+		self.player = player
+		self.mask = None
+		self.zobrist = self.zobrist_hash()
+	
 	# Copies this board into another OwareState
 	def copy_into(self, other):
 		# Do the superclass copying
 		game_state.GameState.copy_into(self, other)
-		# Copy over the pit, keep, next-player values
-		other.pits = [x for x in self.pits]
-		other.keeps = [x for x in self.keeps]
+		# Copy over the board and next-player values (the board is immutable,
+		#  so the copy can share it)
+		other.board = self.board
 		other.player = self.player
+		other.mask = self.mask
+		other.zobrist = self.zobrist
 	
 	# Returns an OwareState, containing this state's properties, which can 
 	#  safely be modified without modifying this one
+	#
+	# Skips __init__(), since clear() would only build a board that
+	#  copy_into() immediately replaces.
 	def make_copy(self):
-		r = OwareState()
+		r = OwareState.__new__(OwareState)
 		self.copy_into(r)
 		return r
 	
@@ -116,13 +289,13 @@ class OwareState(game_state.GameState):
 	# "player" is a valid player ID
 	# "pit" is a number, 0-5, indicating the desired pit
 	def get_pit_count(self, player, pit):
-		return self.pits[ (player-1)*6 + pit ]
+		return self.board[ (player-1)*6 + pit ]
 	
 	# Returns the number of stones in the indicated player's keep
 	#
 	# "player" is a valid player ID
 	def get_keep_count(self, player):
-		return self.keeps[player-1]
+		return self.board[OwareState.KEEP + player-1]
 	
 	# Returns the pit on which the indicated move will end -- that is,
 	# if I move from the indicated pit, which pit will receive the last stone.
@@ -131,13 +304,8 @@ class OwareState(game_state.GameState):
 	# player, pit arguments are as in get_pit_count()
 	def get_pit_target(self, player, pit):
 		pit = pit + (player-1)*6
-		# Count the stones in the indicated pit
-		stones = self.pits[pit]
-		# Get the number of times we'll actually circle the board
-		cycles = stones // 12
-		# Get the final pit we'll land in
-		# NB: Add # of cycles to this, since we have to skip the original pit
-		dest = (pit + stones + cycles) % 12
+		# Look up the final pit we'll land in
+		dest = SOWING[pit][self.board[pit]][1]
 		destPlayer = 1 if dest < 6 else 2
 		return (destPlayer, dest % 6)
 	
@@ -157,7 +325,7 @@ class OwareState(game_state.GameState):
 		upperBound = player*6
 		# If any one contains stones, the player is not empty
 		for i in range(12)[lowerBound:upperBound]:
-			if self.pits[i] > 0:
+			if self.board[i] > 0:
 				return False
 		return True
 	
@@ -165,7 +333,7 @@ class OwareState(game_state.GameState):
 	#
 	# "player" is a valid player ID
 	def is_win(self, player):
-		if self.keeps[player-1] > 24:
+		if self.board[OwareState.KEEP + player-1] > 24:
 			return True
 		if player != self.player or not self.is_empty(player):
 			return False
@@ -177,61 +345,122 @@ class OwareState(game_state.GameState):
 	#
 	# "move" is an OwareMove object
 	def kills_opponent(self, move):
+		return self.pit_kills_opponent(move.get_player(), move.get_move())
+	
+	# Returns True if moving the indicated pit would leave the opposing player
+	#  with no stones, False else
+	#
+	# player, pit arguments are as in get_pit_count()
+	def pit_kills_opponent(self, player, pit):
 		# Get the internal pit number and the opposing player's bounds
-		pit = move.get_move() + (move.get_player()-1)*6
-		otherPlayer = (move.get_player() % 2) + 1
+		pit = pit + (player-1)*6
+		otherPlayer = (player % 2) + 1
 		lowerBound = (otherPlayer-1)*6
 		upperBound = otherPlayer*6
+		board = self.board
 		
-		# Count the stones in the indicated pit
-		stones = self.pits[pit]
-		# Get the number of times we'll actually circle the board
-		cycles = stones // 12
-		# Get the final pit we'll land in
-		# NB: Add # of cycles to this, since we have to skip the original pit
-		dest = (pit + stones + cycles) % 12
+		# Look up how the stones get sown and the final pit we'll land in
+		delta, dest = SOWING[pit][board[pit]]
 		
 		# If we're landing in our own territory (i.e., outside the opponent's
-		#  bounds)
+		#  bounds), nothing gets captured, so the opponent will have no stones
+		#  only if none of his/her pits have any after sowing
 		if dest < lowerBound or dest >= upperBound:
-			# If we never made it to opponent's territory (i.e., distance
-			#  between starting location and our own upper bound is greater
-			#  than the number of stones we have) AND the opponent's pits are
-			#  all empty, then the opponent will have no stones
-			# Otherwise, the opponent will have stones.
-			return stones < move.get_player()*6 - pit \
-					and self.is_empty(otherPlayer)
-					
-		# The number of stones in the target pit will increase by the number
-		#  of times we cycle the board + 1
-		destCount = self.pits[dest] + cycles + 1
-		
-		# If that number is 2 or 3, we will capture the opponent's pits
-		if destCount == 2 or destCount == 3:
-			# If we cycled the board at least once, then all the opponent's pits
-			#  above the target pit will have at least one stone
-			if cycles > 0 and dest % 6 != 5:
-				return False
-			# If any of the opponent's pits above the target had stones to
-			#  begin with, they're safe and so is the opponent
-			for i in range(12)[dest+1:upperBound]:
-				if self.pits[i] > 0:
-					return False
-			# Otherwise, check the opponent's pits below the target
-			for i in range(12)[lowerBound:dest]:
-				# Each of them will also increase by the number of cycles + 1
-				pCount = self.pits[i] + cycles + 1
-				# If any of them equals neither 2 nor 3, it's safe and so
-				#  is the opponent
-				if pCount != 2 and pCount != 3:
+			for i in range(lowerBound, upperBound):
+				if board[i] + delta[i] > 0:
 					return False
-			# If we're capturing and all the above tests fail, the move
-			#  deprives the opponent of all his/her stones
 			return True
 		
-		# If we're not capturing, the opponent is safe
-		return False
+		# If any of the opponent's pits above the target have stones after
+		#  sowing, they're safe and so is the opponent
+		for i in range(dest+1, upperBound):
+			if board[i] + delta[i] > 0:
+				return False
+		# Otherwise, walk the capture chain down from the target: if any pit
+		#  ends up with neither 2 nor 3 stones, it's safe and so is the
+		#  opponent
+		for i in range(lowerBound, dest+1):
+			pCount = board[i] + delta[i]
+			if pCount != 2 and pCount != 3:
+				return False
+		# If the whole chain is captured, the move deprives the opponent of
+		#  all his/her stones
+		return True
+	
+	# Returns True if the indicated move captures stones -- that is, its last
+	#  stone lands in an opponent's pit, making 2 or 3 -- False else
+	#
+	# "move" is an OwareMove object valid on this state
+	def is_capture(self, move):
+		pit = move.get_move() + (move.get_player()-1)*6
+		delta, dest = SOWING[pit][self.board[pit]]
+		if (dest < 6) == (pit < 6):
+			return False
+		count = self.board[dest] + delta[dest]
+		return count == 2 or count == 3
 	
+	# Returns True if the indicated move clears the repeated-state history
+	#  (see move()), which it does if it captures
+	#
+	# "move" is an OwareMove object valid on this state
+	def clears_repeats(self, move):
+		return self.is_capture(move)
+	
+	# Returns True if the player to move has no capturing move, and the
+	#  opponent has stones (so no move is forced by the starvation rule), False
+	#  else
+	def is_quiet(self):
+		otherPlayer = (self.player % 2) + 1
+		if self.is_empty(otherPlayer):
+			return False
+		mask = self.legal_move_mask()
+		shared = OwareMove.MOVES[self.player]
+		for i in range(6):
+			if mask[i] and self.is_capture(shared[i]):
+				return False
+		return True
+	
+	# Returns True if the indicated move is worth playing out past the search
+	#  horizon: a capture, or any move while the opponent has no stones (the
+	#  move must then feed the opponent, and the game may end)
+	#
+	# "move" is an OwareMove object valid on this state
+	def is_tactical(self, move):
+		return self.is_capture(move) or self.is_empty((self.player % 2) + 1)
+	
+	# Returns a tuple of 6 booleans, one per pit of the player to move, which
+	#  is True for exactly the pits that player may legally move.
+	#
+	# A pit is legal if it has stones and moving it doesn't deprive the
+	#  opponent of all his/her stones -- unless every pit with stones would,
+	#  in which case they are all legal.  Each pit is simulated once, and the
+	#  result is cached until the state changes, so is_valid_move() and
+	#  successor_moves() are cheap to call repeatedly.
+	def legal_move_mask(self):
+		if self.mask != None:
+			return self.mask
+		offset = (self.player-1)*6
+		mask = [False] * 6
+		starving = []
+		for i in range(6):
+			# a pit with no stones can't be moved
+			if self.board[offset + i] == 0:
+				continue
+			# note the pits which would deprive the other player of all stones
+			if self.pit_kills_opponent(self.player, i):
+				starving.append(i)
+			else:
+				mask[i] = True
+		# those are only allowed if there are no other moves available
+		if True not in mask:
+			for i in starving:
+				mask[i] = True
+		self.mask = tuple(mask)
+		return self.mask
+	
+	# Returns True if the player to move has any legal move, False else
+	def has_legal_moves(self):
+		return True in self.legal_move_mask()
 	
 	# Returns True if the indicated move is valid on this state, False else.
 	#
@@ -243,22 +472,9 @@ class OwareState(game_state.GameState):
 		# if it's not a valid pit, invalid
 		if move.get_move() < 0 or move.get_move() > 5:
 			return False
-		pit = move.get_move() + (move.get_player()-1)*6
-		# if the indicated pit contains no stones, invalid
-		if self.pits[pit] == 0:
-			return False
-		# if this move would deprive the other player of all stones
-		#  and there are moves available which would not, invalid
-		if self.kills_opponent(move):
-			for i in range(6):
-				if i == move.get_move():
-					continue
-				pit = i + (move.get_player()-1)*6
-				if self.pits[pit] > 0 and \
-						not self.kills_opponent(OwareMove(move.get_player(),i)):
-					return False
-		# otherwise, it's a valid move.
-		return True
+		# otherwise, it's valid if the pit has stones and isn't ruled out by
+		#  the starvation rule
+		return self.legal_move_mask()[move.get_move()]
 	
 	# Deals with a signal from the GameController that this state repeats
 	#  one that has been played previously.
@@ -267,14 +483,14 @@ class OwareState(game_state.GameState):
 	#  evenly between the players (fractionally if the remaining # of stones is
 	#  odd).  This will leave the game in a finalized state.
 	def handle_cycle(self):
-		sum = 0
 		# Count remaining stones
-		for i in range(12):
-			sum += self.pits[i]
-			self.pits[i] = 0
-		# Divide remaining stones between players
-		self.keeps[0] += float(sum) / 2
-		self.keeps[1] += float(sum) / 2
+		half = float(sum(self.board[:OwareState.KEEP])) / 2
+		# Empty the pits and divide remaining stones between players
+		self.board = (0,) * 12 \
+				+ (self.board[OwareState.KEEP] + half, \
+					self.board[OwareState.KEEP + 1] + half)
+		self.mask = None
+		self.zobrist = self.zobrist_hash()
 	
 	# Performs the indicated move destructively on this state, replacing its
 	#  previous values with the new values resulting from the move.
@@ -284,28 +500,17 @@ class OwareState(game_state.GameState):
 		if not self.is_valid_move(move):
 			return None
 		
-		# get stones out of pit
+		# get stones out of pit and distribute them in one go, working on a
+		#  mutable copy of the board that's packed back up below
 		pit = move.get_move() + (move.get_player()-1)*6
-		stones = self.pits[pit]
-		self.pits[pit] = 0
-		
-		# distribute stones
-		pitIter = pit
-		while stones > 0:
-			# increment iterator with wrapping
-			pitIter = (pitIter + 1) % 12
-			# Skip the original pit
-			if pitIter == pit:
-				continue
-			# increase pit value and decrement stones in hand
-			self.pits[pitIter] += 1
-			stones -= 1
+		delta, pitIter = SOWING[pit][self.board[pit]]
+		board = map(operator.add, self.board, delta)
 			
 		# if we landed in an opponent's pit and == 2 or == 3, capture
 		lowerBound = (self.player-1)*6
 		upperBound = self.player*6 - 1
 		if (pitIter < lowerBound or pitIter > upperBound) \
-				and (self.pits[pitIter] == 2 or self.pits[pitIter] == 3) \
+				and (board[pitIter] == 2 or board[pitIter] == 3) \
 				and self.controller != None:
 			# We can wipe the controller's memory of repeated states if we're
 			#  capturing
@@ -313,16 +518,49 @@ class OwareState(game_state.GameState):
 				self.controller.clear_repeat()
 			
 		while (pitIter < lowerBound or pitIter > upperBound) \
-				and (self.pits[pitIter] == 2 or self.pits[pitIter] == 3):
+				and (board[pitIter] == 2 or board[pitIter] == 3):
 			# Increase keep count, remove stones from pit, and decrement
 			#  iterator with wrapping
-			self.keeps[self.player-1] += self.pits[pitIter]
-			self.pits[pitIter] = 0
+			board[OwareState.KEEP + self.player-1] += board[pitIter]
+			board[pitIter] = 0
 			pitIter = (pitIter - 1) % 12
+		
+		# update the hash key for the pits and keep which changed
+		old = self.board
+		h = self.zobrist ^ ZOBRIST_PLAYER
+		for i in range(12):
+			if board[i] != old[i]:
+				h ^= ZOBRIST_PITS[i][old[i]] ^ ZOBRIST_PITS[i][board[i]]
+		keep = OwareState.KEEP + self.player-1
+		if board[keep] != old[keep]:
+			h ^= ZOBRIST_KEEPS[self.player-1][int(2 * old[keep])] \
+				^ ZOBRIST_KEEPS[self.player-1][int(2 * board[keep])]
+		self.zobrist = h
+		self.board = tuple(board)
 			
 		# switch players
 		self.player = (self.player % 2) + 1
+		self.mask = None
 		return self.player
+	
+	# Performs the indicated move as move() does, but returns an undo record
+	#  for unmove() instead of the next player (or None if the move is
+	#  invalid).
+	#
+	# The board is immutable, so the record is just the old board and player
+	#  (plus the legal move mask and hash key, which saves recomputing them).
+	#
+	# "move" is an OwareMove object
+	def make_move(self, move):
+		record = (self.board, self.player, self.mask, self.zobrist)
+		if self.move(move) == None:
+			return None
+		return record
+	
+	# Restores this state to how it was before the make_move() call which
+	#  returned "record"
+	def unmove(self, record):
+		self.board, self.player, self.mask, self.zobrist = record
 		
 	# Returns the list of valid successor moves from this state
 	#  or None if the controller refuses to allow any more expansions
@@ -334,13 +572,9 @@ class OwareState(game_state.GameState):
 		moves = game_state.GameState.successor_moves(self)
 		if(moves == None):
 			return None
+		mask = self.legal_move_mask()
+		shared = OwareMove.MOVES[self.player]
 		for i in range(6):
-			move = OwareMove(self.player, i)
-			# first condition saves us looping over all other moves
-			#  (in is_valid_move()) to find out if there are non-killing
-			#  moves when not necessary
-			if (self.get_pit_count(self.player, i) > 0 \
-						and not self.kills_opponent(move)) \
-					or self.is_valid_move(move):
-				moves.append(move)
+			if mask[i]:
+				moves.append(shared[i])
 		return moves
\ No newline at end of file
@@ -0,0 +1,361 @@
+import mmap
+import os
+import sys
+import time
+
+import oware
+
+# Oware endgame database: the result of every position with up to a given
+# number of stones left on the board, found by retrograde analysis under the
+# rules in oware.py, and looked up by a memory-mapped file.
+#
+# A position is looked at from the point of view of the player to move: their
+# pits come first (the board turned round for player 2), so the same entry
+# serves both players.  Since no stone leaves the board except into a keep,
+# and a player whose keep is over 24 has already won, the only other thing
+# which matters is the keep of the player to move, and better for them the
+# more it holds.  So for each distribution of stones over the 12 pits, an
+# entry of one byte holds two thresholds: with "t" = 24 minus the keep of the
+# player to move (0 to the stones on the board, while neither player has
+# won), they win if t < the low 4 bits, lose if t >= the high 4 bits, and
+# draw otherwise.
+#
+# Starvation and the end of the game follow the GameController: a player who
+# can't move draws, and a player who takes their keep past 24 wins.  A line
+# which never captures again ends when a position repeats, and the stones are
+# split evenly (handle_cycle()); but the controller gives the game only to the
+# player who made the repeating move, if their half takes them past 24, and
+# otherwise scores a draw.  Who that is depends on the game's history, which
+# the database can't know, so each position has two entries: its result if
+# every cycle goes the worst way it could for the player to move, and if
+# every cycle goes the best way.  Where they agree the result is exact
+# whatever the history; where they don't, the database doesn't answer.
+#
+# The entries are in order of the number of stones on the board, and within
+# that by a combinatorial ranking of the pit distributions (see rank()), so a
+# position's entries are found without searching.  The file is MAGIC, a byte
+# giving the number of stones covered, then the (worst, best) pairs of
+# entries.
+#
+# Run this module to build a database:
+#   python oware_endgame.py STONES [FILE]
+
+# Number of pits on the board
+PITS = 12
+# Most stones on the board a database can cover (a threshold is 4 bits)
+MAX_STONES = 14
+# The keep a player must get past to win
+HALF = oware.STONES // 2
+# Start of a database file
+MAGIC = "OWARE-ENDGAME\n"
+# Where players look for the database (see EndgameDatabase.load())
+FILE = "endgame.dat"
+# Where a database is built by default, relative to the game directory
+BUILD_FILE = os.path.join("players", "oware", FILE)
+
+# Results, from the point of view of the player to move
+LOSS = 0
+DRAW = 1
+WIN = 2
+
+# BINOMIAL[n][k] is n choose k (0 if k > n), for every n and k the rankings
+# need
+BINOMIAL = [[1] + [0] * PITS]
+for n in range(1, MAX_STONES + PITS + 1):
+	row = BINOMIAL[-1]
+	BINOMIAL.append([1] + [row[k-1] + row[k] for k in range(1, PITS + 1)])
+
+# Returns the number of distributions of "stones" stones over the pits
+def layer_size(stones):
+	return BINOMIAL[stones + PITS - 1][PITS - 1]
+
+# Returns the number of distributions of fewer than "stones" stones over the
+# pits: the index of the first entry for "stones" stones
+def layer_offset(stones):
+	return BINOMIAL[stones + PITS - 1][PITS]
+
+# Returns the rank of the distribution "pits" (a tuple of 12 counts) among all
+# distributions of the same number of stones, 0 to layer_size() - 1.
+#
+# Write the stones in a row, with a bar between one pit's and the next: the
+# 11 bars fall in 11 of stones + 11 places, and the rank is the position of
+# that set of places in the colexicographic order of all of them (the
+# combinatorial number system).
+def rank(pits):
+	r = 0
+	stones = 0
+	for j in range(1, PITS):
+		stones += pits[j-1]
+		r += BINOMIAL[stones + j - 1][j]
+	return r
+
+# Returns the index of the entry for the distribution "pits"
+def index(pits):
+	return layer_offset(sum(pits)) + rank(pits)
+
+# Returns every distribution of "stones" stones over "pits" pits, as tuples
+def distributions(stones, pits=PITS):
+	if pits == 1:
+		return [(stones,)]
+	return [(first,) + rest for first in range(stones + 1) \
+				for rest in distributions(stones - first, pits - 1)]
+
+# Returns the result for the player to move stored in the entry "entry", when
+# "t" is 24 minus their keep
+def entry_result(entry, t):
+	if t < entry & 15:
+		return WIN
+	if t >= entry >> 4:
+		return LOSS
+	return DRAW
+
+# Returns the worst and best results, for the player to move, of a line
+# which never captures again on a board holding "stones" stones, when "t" is
+# 24 minus their keep, as a (worst, best) tuple.  A player whose half of the
+# stones would take them past 24 wins if they make the repeating move, and
+# draws if the other player does.
+def cycle_results(stones, t):
+	if 2 * t < stones:
+		return (DRAW, WIN)
+	if 2 * t > stones:
+		return (LOSS, DRAW)
+	return (DRAW, DRAW)
+
+# Returns the entries for the "stones" stones layer as a (worst, best) pair of
+# lists, given "tables", the (worst, best) entries for fewer stones.  Moves
+# which capture lead to those; moves which don't stay in the layer, where the
+# results are found by working back from its exits (captures, and players
+# who can't move), separately for each pair of keeps the players may hold.
+def solve_layer(stones, tables):
+	boards = [None] * layer_size(stones)
+	for pits in distributions(stones):
+		boards[rank(pits)] = pits
+	
+	# For each board: the ranks of the boards its non-capturing moves lead to
+	#  (turned round for the opponent), the (captured, index) pairs of its
+	#  capturing moves, and whether the player to move can't move at all
+	state = oware.OwareState()
+	kids = []
+	parents = [[] for pits in boards]
+	captures = []
+	for r, pits in enumerate(boards):
+		state.board = pits + (0, 0)
+		state.player = 1
+		state.mask = None
+		moving = []
+		taking = []
+		for move in state.successor_moves():
+			record = state.make_move(move)
+			board = state.board
+			child = board[6:12] + board[0:6]
+			state.unmove(record)
+			taken = board[oware.OwareState.KEEP]
+			if taken == 0:
+				moving.append(rank(child))
+				parents[moving[-1]].append(r)
+			else:
+				taking.append((taken, index(child)))
+		kids.append(moving)
+		captures.append(taking)
+	
+	# results[bound][t][r], bound being 0 for the worst results and 1 for the
+	#  best
+	results = [[[None] * len(boards) for t in range(stones + 1)] \
+			for bound in (0, 1)]
+	for t in range(stones // 2 + 1):
+		for bound in (0, 1):
+			solve_keeps(stones, t, stones - t, kids, parents, captures, \
+					tables, bound, results)
+	
+	entries = ([], [])
+	for bound in (0, 1):
+		for r in range(len(boards)):
+			column = [results[bound][t][r] for t in range(stones + 1)]
+			if sorted(column, reverse=True) != column:
+				raise ValueError("Results for %s aren't monotonic: %s" \
+						% (boards[r], column))
+			entries[bound].append(column.count(WIN) \
+					| (stones + 1 - column.count(LOSS)) << 4)
+	return entries
+
+# Fills in results[bound][t0] and results[1 - bound][t1] (t0 + t1 == stones)
+# for every board of the layer: positions where the player to move has
+# 24 - t0 in their keep alternate with ones where they have 24 - t1, as long
+# as nobody captures.
+#
+# Call the player to move at t0 A, and the other B.  Every cycle, in this
+# layer or any other, is scored the worst way for A if "bound" is 0 and the
+# best if it is 1 -- which is the other bound for B.  For each level of result
+# X (draw, win), the positions where A can make sure of at least X are found
+# as the set one player can force play into: if endless play is good enough
+# for A, B must force it to an exit worse than X for A; otherwise A must force
+# it to an exit at least X.
+def solve_keeps(stones, t0, t1, kids, parents, captures, tables, bound, \
+		results):
+	size = len(kids)
+	# exits[2*r + side] lists the results for A of the ways out of the layer
+	#  from board r with A (side 0) or B (side 1) to move; a capture leads to
+	#  a position with the other player to move, so to B's entries for the
+	#  other bound, or A's for the same one
+	exits = []
+	for r in range(size):
+		for side, t in ((0, t0), (1, t1)):
+			table = tables[1 - bound] if side == 0 else tables[bound]
+			if not kids[r] and not captures[r]:
+				out = [DRAW]
+			else:
+				out = [WIN if taken > t \
+						else WIN - entry_result(table[i], stones - t) \
+						for taken, i in captures[r]]
+			if side == 1:
+				out = [WIN - x for x in out]
+			exits.append(out)
+	
+	endless = cycle_results(stones, t0)[bound]
+	forced = []
+	for level in (DRAW, WIN):
+		if endless >= level:
+			escape = attractor(1, lambda x: x < level, kids, parents, exits)
+			forced.append([not x for x in escape])
+		else:
+			forced.append(attractor(0, lambda x: x >= level, kids, parents, \
+					exits))
+	
+	for r in range(size):
+		value = WIN if forced[1][2*r] else DRAW if forced[0][2*r] else LOSS
+		results[bound][t0][r] = value
+		value = WIN if forced[1][2*r+1] else DRAW if forced[0][2*r+1] else LOSS
+		results[1 - bound][t1][r] = WIN - value
+
+# Returns a list, indexed as "exits" in solve_keeps(), which is True for the
+# positions from which player "side" (0 for A, 1 for B) can force play to
+# leave the layer by an exit whose result for A passes "target"
+def attractor(side, target, kids, parents, exits):
+	forced = [False] * len(exits)
+	# For the other player's positions, the number of moves which don't
+	#  (yet) lead to a forced position
+	free = [0] * len(exits)
+	queue = []
+	for i, out in enumerate(exits):
+		hits = len([x for x in out if target(x)])
+		if i & 1 == side:
+			forced[i] = hits > 0
+		else:
+			free[i] = len(kids[i >> 1]) + len(out) - hits
+			forced[i] = free[i] == 0
+		if forced[i]:
+			queue.append(i)
+	while queue:
+		i = queue.pop()
+		other = 1 - (i & 1)
+		for r in parents[i >> 1]:
+			j = 2 * r + other
+			if forced[j]:
+				continue
+			if other != side:
+				free[j] -= 1
+				if free[j] > 0:
+					continue
+			forced[j] = True
+			queue.append(j)
+	return forced
+
+# Builds a database of every position with up to "stones" stones on the
+# board, and writes it to the file "fname".  Reports progress on "out".
+def build(stones, fname, out=sys.stdout):
+	if stones < 0 or stones > MAX_STONES:
+		raise ValueError("Can only cover 0-%d stones" % MAX_STONES)
+	tables = ([], [])
+	for n in range(stones + 1):
+		start = time.time()
+		worst, best = solve_layer(n, tables)
+		tables[0].extend(worst)
+		tables[1].extend(best)
+		out.write("%2d stones: %9d positions, %8.1f seconds\n" \
+				% (n, layer_size(n), time.time() - start))
+	fout = open(fname, 'wb')
+	fout.write(MAGIC + chr(stones) + "".join([chr(worst) + chr(best) \
+			for worst, best in zip(*tables)]))
+	fout.close()
+
+
+# A database built by build(), read through a memory map, so that opening it
+# costs nothing and only the pages looked at are read.
+#
+# probe() follows the interface GameSearch expects of an endgame database.
+class EndgameDatabase(object):
+	# "fname" is the file to open
+	def __init__(self, fname):
+		fin = open(fname, 'rb')
+		try:
+			self.data = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+		finally:
+			fin.close()
+		if self.data[:len(MAGIC)] != MAGIC:
+			raise ValueError("%s is not an Oware endgame database" % fname)
+		# Most stones on the board the database covers
+		self.stones = ord(self.data[len(MAGIC)])
+		self.base = len(MAGIC) + 1
+		if len(self.data) != self.base + 2 * layer_offset(self.stones + 1):
+			raise ValueError("%s is the wrong size" % fname)
+	
+	# Opens the database file "fname" in the Oware players' directory, or
+	# returns None if there isn't one.
+	#
+	# Follows the convention for player files: the working directory is
+	# restored afterward.
+	@classmethod
+	def load(cls, fname=FILE):
+		wd = os.getcwd()
+		os.chdir("players/oware")
+		try:
+			if not os.path.exists(fname):
+				return None
+			return cls(fname)
+		finally:
+			os.chdir(wd)
+	
+	# Returns the result for the player to move (WIN, DRAW or LOSS) with the
+	# stones "pits" on the board (their pits first) and "keep" in their keep,
+	# or None if the database doesn't cover the position or its result
+	# depends on who would make a repeating move
+	def result(self, pits, keep):
+		stones = sum(pits)
+		t = HALF - keep
+		if stones > self.stones or t < 0 or t > stones or t != int(t):
+			return None
+		offset = self.base + 2 * (layer_offset(stones) + rank(pits))
+		worst = entry_result(ord(self.data[offset]), t)
+		if worst != entry_result(ord(self.data[offset + 1]), t):
+			return None
+		return worst
+	
+	# Looks up the OwareState "state".  Returns None if the database doesn't
+	# cover it or doesn't know its result exactly; else 0 if it is drawn, or
+	# the number of stones on the board, positive if the player to move wins
+	# and negative if they lose.  (The database doesn't know how far away the
+	# end is, so counting the stones left makes a search prefer lines which
+	# capture.)
+	def probe(self, state):
+		player = state.get_next_player()
+		pits = state.pits
+		if player != 1:
+			pits = pits[6:] + pits[:6]
+		result = self.result(pits, state.get_keep_count(player))
+		if result == None:
+			return None
+		return (result - DRAW) * sum(pits)
+	
+	# Releases the memory map
+	def close(self):
+		self.data.close()
+
+
+if __name__ == '__main__':
+	if len(sys.argv) not in (2, 3) or not sys.argv[1].isdigit():
+		print "Usage: python oware_endgame.py STONES [FILE]"
+		print "  Builds the database of positions with up to STONES stones " \
+			"on the board"
+		print "  (default file %s)" % BUILD_FILE
+		sys.exit(2)
+	build(int(sys.argv[1]), sys.argv[2] if len(sys.argv) == 3 else BUILD_FILE)
@@ -1,15 +1,44 @@
 import game_state
 import game_player
+import game_book
+import game_pns
+import game_solver
+import game_ordering
+import game_search
+import game_table
 import oware
+import oware_endgame
 import os
 import math
-import sys
+import time
 
 class OwarePlayer(game_player.GamePlayer):
+  # The search tournament_move() deepens with (see GameSearch)
+  DRIVER = game_search.GameSearch.PVS
+  # Once this few stones are left on the board, tournament_move() first
+  # tries to prove the game won or drawn (see game_pns.py)
+  PROOF_STONES = 12
+
   # Make a note of our name (will be the module name)
   # and player ID (will be a valid player ID for an OwareState).
   def __init__(self, name, game_id):
     game_player.GamePlayer.__init__(self, name, game_id)
+    # The shared search engine does the tree search with our evaluation,
+    # remembering positions it has seen (Oware transposes a lot),
+    # searching likely moves (captures, killers) first and playing out
+    # captures past the horizon with up to a quarter of the expansions.
+    # What it learns is kept from turn to turn.  Once few enough stones
+    # are left, positions are looked up in the endgame database, if one
+    # has been built (see oware_endgame.py).
+    self.search = game_search.GameSearch(self.evaluate, \
+                    game_table.TranspositionTable(), \
+                    game_ordering.MoveOrdering(), quiescence=0.25, keep=True, \
+                    endgame=oware_endgame.EndgameDatabase.load())
+    # minimax_move() and alpha_beta_move() measure the plain algorithms, so
+    # they search with none of that
+    self.plain = game_search.GameSearch(self.evaluate)
+    # The opening book, if one has been built (see game_book.py)
+    self.book = game_book.OpeningBook.load("oware")
 
   # EXAMPLE: Loads a file from the same directory this module is stored in
   # and returns its contents.  Pattern any file operations you do in your
@@ -131,111 +160,6 @@ class OwarePlayer(game_player.GamePlayer):
 
     return value
 
-  # Does most of the terminal checks for a single step in the search
-  #
-  # state is a Oware object
-  # horizon is steps to the ply horizon
-  # players is the list of valid player IDs
-  #
-  # Returns None if no termination, (value, move) otherwise
-  def terminal_checks(self, state, horizon, players):
-    # If first player wins, that's a positive
-    if state.is_win(players[0]):
-      return (sys.maxint, None)
-    # If second player wins, that's a negative
-    elif state.is_win(players[1]):
-      return (-sys.maxint - 1, None)
-
-    # If there are no more expansions allowed, or if
-    # we hit the horizon, evaluate
-    if state.expansions_count() <= 0 or horizon <= 0:
-      return (self.evaluate(state), None)
-
-    # if no termination, return None
-    return None
-
-  # minimax_search function. A help function for minimax_move. This one returns
-  # a (value, move) tuple that lets us back values up the tree and still return
-  # a move at the top.
-  #
-  # state is an Oware object
-  # horizon is an integer representing the distance to the ply horizon
-  def minimax_search(self, state, horizon):
-    # Get player IDs
-    players = state.get_players()
-
-    # Do most of our terminal checks
-    term = self.terminal_checks(state, horizon, players)
-    if term != None:
-      return term
-
-    # Get successor states
-    # We should check to see if this is None, but since we just
-    # checked to see if expansion_count was <= 0, we're safe
-    successors = state.successors()
-    # If there are no successors and nobody's won, it's a draw
-    if len(successors) == 0:
-      return (0, None)
-
-    # Recur on each of the successor states (note we take the state out
-    # of the successor tuple with x[1] and decrease the horizon)
-    values = map(lambda x: self.minimax_search(x[1], horizon - 1), successors)
-    # We're not interested in the moves made, just the minimax values
-    values = [x[0] for x in values]
-    # Look for the best among the returned values
-    # Max if we're player 1
-    # Min if we're player 2
-    if state.get_next_player() == players[0]:
-      max_idx = max(enumerate(values), key = lambda x: x[1])[0]
-    else:
-      max_idx = min(enumerate(values), key = lambda x: x[1])[0]
-    # Return the minimax value and corresponding move
-    return (values[max_idx], successors[max_idx][2])
-
-  # A helper function for alpha_beta_move().  See minimax_search().
-  #
-  # a,b are alpha, beta values.
-  def alpha_beta_search(self, state, horizon, a, b):
-    # Get player IDs
-    players = state.get_players()
-    player = state.get_next_player()
-
-    # Do most of our terminal checks
-    term = self.terminal_checks(state, horizon, players)
-    if term != None:
-      return term
-
-    # Get successor states
-    # We should check to see if this is None, but since we just
-    # checked to see if expansion_count was <= 0, we're safe
-    successors = state.successors()
-    # If there are no successors and nobody's won, it's a draw
-    if len(successors) == 0:
-      return (0, None)
-
-    # We start out with a low best-value and no move
-    v = -sys.maxint - 1 if player == players[0] else sys.maxint
-    m = None
-    for s in successors:
-      # Recur on the successor state
-      s_val = self.alpha_beta_search(s[1], horizon - 1, a, b)
-      # If our new value is better than our best value, update the best
-      # value and the best move
-      if (player == players[0] and s_val[0] > v) \
-          or (player == players[1] and s_val[0] < v):
-        v = s_val[0]
-        m = s[2]
-      # If we're maxing and exceeding the min above, just return
-      # Likewise if we're minning and exceeding the max above
-      if (player == players[0] and v >= b) \
-          or (player == players[1] and v <= a):
-        return (v, m)
-      # Update a,b for the next successor
-      a = a if player == players[1] else max(a, v)
-      b = b if player == players[0] else min(b, v)
-    # return the best value, move we found
-    return (v, m)
-
   # Get the expansion horizon due to current state and the number
   # of nodes for expansion
   #
@@ -261,7 +185,7 @@ class OwarePlayer(game_player.GamePlayer):
   def minimax_move(self, state):
     horizon = self.get_horizon(state, 0)
     print "Expansion horizon: ", horizon
-    return self.minimax_search(state, horizon)[1]
+    return self.plain.minimax(state, horizon)[1]
 
   # Get a move for the indicated state, using an alpha-beta search
   #
@@ -269,8 +193,57 @@ class OwarePlayer(game_player.GamePlayer):
   def alpha_beta_move(self, state):
     horizon = self.get_horizon(state, 1)
     print "Expansion horizon: ", horizon
-    return self.alpha_beta_search(state, horizon, -sys.maxint - 1, sys.maxint)[1]
+    return self.plain.alpha_beta(state, horizon)[1]
 
-  # For the first player, use alpha_beta algorithm; for the second one use minimax
+  # Get a move for the indicated state: from the opening book if it has the
+  # position, or once few stones are left, by proving the game won or drawn
+  # if it can; else by searching deeper and deeper (with principal variation
+  # search, unless DRIVER says otherwise) for as long as the expansions (and
+  # time) allow
+  #
+  # state is an Oware object
   def tournament_move(self, state):
-    return self.alpha_beta_move(state)
+    if self.book != None:
+      move = self.book.move(state)
+      if move != None:
+        print "Book move"
+        # Nothing predicted to ponder on
+        self.search.pv = [move]
+        return move
+    if sum(state.pits) <= self.PROOF_STONES:
+      move = self.proof_move(state)
+      if move != None:
+        self.search.pv = [move]
+        return move
+    value, move = self.search.iterative_deepening(state, driver=self.DRIVER)
+    print "Search depth: ", self.search.depth, " nodes: ", self.search.nodes, \
+          " (pondered)" if self.search.ponderHit else ""
+    if self.DRIVER == game_search.GameSearch.MTDF:
+      print "MTD(f) passes: ", self.search.passes
+    return move
+
+  # Try to prove the game won, or failing that drawn, from the indicated
+  # state with proof-number search, using up to half the turn's expansions
+  # and time.  Returns a move which makes sure of the result, or None if the
+  # search couldn't find one.
+  #
+  # state is an Oware object
+  def proof_move(self, state):
+    count = state.expansions_count()
+    nodes = count / 2 if count != None else game_pns.INFINITY
+    deadline = state.get_deadline()
+    if deadline != None:
+      deadline = time.time() + (deadline - time.time()) / 2
+    search = game_pns.ProofNumberSearch(nodes, endgame=self.search.endgame)
+    result, move = search.solve(state, deadline)
+    if move != None:
+      print "Proved", "win" if result == game_solver.GameSolver.WIN \
+            else "draw", "in", search.nodes, "nodes"
+    return move
+
+  # Think on the opponent's time, assuming he/she makes the reply our last
+  # search predicted
+  #
+  # state is an Oware object
+  def ponder(self, state):
+    self.search.ponder(state, self.DRIVER)
@@ -0,0 +1,8 @@
+import game_search
+import chaosun
+
+# The chaosun player, but deepening with MTD(f) instead of principal variation
+#  search in its tournament moves.  Play the two against each other (e.g.,
+#  with --t1 --t2) to compare the searches at the same expansion limit.
+class OwarePlayer(chaosun.OwarePlayer):
+  DRIVER = game_search.GameSearch.MTDF
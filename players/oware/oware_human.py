@@ -42,7 +42,7 @@ class OwarePlayer(game_player.GamePlayer):
 				continue
 			
 			# Return the valid move
-			return oware.OwareMove(self.game_id, s)
+			return oware.OwareMove.of(self.game_id, s)
 			
 	def alpha_beta_move(self, state):
 		return self.minimax_move(state)
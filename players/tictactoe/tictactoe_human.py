@@ -54,7 +54,7 @@ class TicTacToePlayer(game_player.GamePlayer):
 				continue
 			
 			# Return the valid move
-			return tictactoe.TicTacToeMove(self.game_id, s)
+			return tictactoe.TicTacToeMove.of(self.game_id, s)
 	
 	# We're just asking the human, so call minimax
 	def alpha_beta_move(self, state):
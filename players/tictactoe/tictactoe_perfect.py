@@ -0,0 +1,49 @@
+import game_player
+import game_solver
+import tictactoe
+
+
+# A TicTacToePlayer agent which never loses.
+#
+# Tic-tac-toe is small enough to solve outright, so the first of these players
+# created solves the whole game (a few thousand positions, in a fraction of a
+# second), and every move after that is a lookup in what it found.  No
+# expansions are used at all.
+class TicTacToePlayer(game_player.GamePlayer):
+	# The solver shared by every instance, solved from the start
+	solver = None
+	
+	# Make a note of our name and player ID, and solve the game if no player
+	# has yet
+	# see comments on GamePlayer for more details
+	def __init__(self, name, game_id):
+		game_player.GamePlayer.__init__(self, name, game_id)
+		if TicTacToePlayer.solver == None:
+			solver = game_solver.GameSolver()
+			solver.solve(tictactoe.TicTacToeState())
+			TicTacToePlayer.solver = solver
+	
+	# The solver's results are all this agent needs, but an evaluation is
+	# still expected: WIN, DRAW or LOSS for player X
+	#
+	# "state" is a TicTacToeState object
+	def evaluate(self, state):
+		result = TicTacToePlayer.solver.result(state)
+		if state.get_next_player() == state.get_players()[0]:
+			return result
+		return -result
+	
+	# Look up a best move for the indicated state (positions the first solve
+	# didn't need are solved on the spot)
+	#
+	# "state" is still a TicTacToeState object
+	def minimax_move(self, state):
+		return TicTacToePlayer.solver.solve(state)[1]
+	
+	# Just call minimax
+	def alpha_beta_move(self, state):
+		return self.minimax_move(state)
+	
+	# Just call minimax
+	def tournament_move(self, state):
+		return self.minimax_move(state)
@@ -0,0 +1,72 @@
+import unittest
+
+import game_context
+import game_ordering
+import game_search
+import game_table
+import oware
+
+# Tests for GameSearch.  Run with "python -m unittest test_game_search".
+
+# Counts stones kept, as the first player sees it
+def keeps(state):
+	return state.board[oware.OwareState.KEEP] \
+			- state.board[oware.OwareState.KEEP + 1]
+
+class PonderTest(unittest.TestCase):
+	# Gives "state" a turn's worth of expansions to search with
+	def new_turn(self, state):
+		state.setController(game_context.SearchContext(400, None, 1), \
+				False)
+	
+	# A ponder hit carries on with the pondered search: the search of the
+	# position the opponent's predicted reply leads to mustn't age the move
+	# ordering or start a new table generation over again
+	def test_ponder_hit_keeps_tables(self):
+		ordering = game_ordering.MoveOrdering()
+		table = game_table.TranspositionTable(2**12)
+		search = game_search.GameSearch(keeps, table, ordering, keep=True)
+		state = oware.OwareState()
+		self.new_turn(state)
+		search.iterative_deepening(state)
+		state.make_move(search.pv[0])
+		reply = search.pv[1]
+		self.new_turn(state)
+		self.assertTrue(search.ponder(state))
+		killers = [list(moves) for moves in ordering.killers]
+		history = dict(ordering.history)
+		generation = table.search
+		
+		state.make_move(reply)
+		self.new_turn(state)
+		search.start(state, table, ordering)
+		self.assertTrue(search.ponderHit)
+		self.assertEqual([list(moves) for moves in ordering.killers], killers)
+		self.assertEqual(ordering.history, history)
+		self.assertEqual(table.search, generation)
+	
+	# A miss starts a new turn as usual
+	def test_ponder_miss_ages_tables(self):
+		ordering = game_ordering.MoveOrdering()
+		table = game_table.TranspositionTable(2**12)
+		search = game_search.GameSearch(keeps, table, ordering, keep=True)
+		state = oware.OwareState()
+		self.new_turn(state)
+		search.iterative_deepening(state)
+		state.make_move(search.pv[0])
+		reply = search.pv[1]
+		self.new_turn(state)
+		self.assertTrue(search.ponder(state))
+		generation = table.search
+		
+		self.new_turn(state)
+		for move in state.successor_moves():
+			if move != reply:
+				state.make_move(move)
+				break
+		search.start(state, table, ordering)
+		self.assertFalse(search.ponderHit)
+		self.assertEqual(table.search, generation + 1)
+
+if __name__ == '__main__':
+	unittest.main()
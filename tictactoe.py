@@ -1,17 +1,55 @@
 import game_state
 import game_player
 
+# Zobrist keys for TicTacToeState.hash_key(): ZOBRIST_SQUARES[square][player]
+# for each occupied square, and ZOBRIST_O when O is to move
+ZOBRIST_SQUARES = [[0] + game_state.zobrist_keys(2, 4000 + i) \
+					for i in range(9)]
+ZOBRIST_O = game_state.zobrist_keys(1, 5000)[0]
+
+# Returns the 8 symmetries of the board, as tuples giving the square each
+# square goes to: the identity, then quarter turns clockwise, then the same
+# four with the board reflected left to right first
+def build_symmetries():
+	symmetries = []
+	for squares in (range(9), [3*(i//3) + 2 - i%3 for i in range(9)]):
+		for turn in range(4):
+			symmetries.append(tuple(squares))
+			squares = [3*(i%3) + 2 - i//3 for i in squares]
+	return symmetries
+
+# SYMMETRIES[symmetry][square] is the square "square" goes to under the
+# symmetry (see TicTacToeState.canonical_key()), and INVERSE[symmetry][square]
+# the square which goes to "square"
+SYMMETRIES = build_symmetries()
+INVERSE = [tuple([s.index(i) for i in range(9)]) for s in SYMMETRIES]
+
 # Subclass of GameMove representing one move by one player in a
 # tic-tac-toe class
+#
+# Moves are immutable.  There are only 18 distinct non-forfeit moves, so
+# rather than creating new ones, use TicTacToeMove.of() to get the shared
+# instance.
 class TicTacToeMove(game_state.GameMove):
+	__slots__ = ('move', 'player', 'forfeit')
+	
 	# player: a TicTacToePlayer object representing the player making the
 	#  move
 	# move: a number representing the square being moved to
 	# forfeit: a boolean which is True only if the player wishes to give up
 	def __init__(self, player, move, forfeit=False):
-		self.move = move
-		self.player = player
-		self.forfeit = forfeit
+		object.__setattr__(self, 'move', move)
+		object.__setattr__(self, 'player', player)
+		object.__setattr__(self, 'forfeit', forfeit)
+	
+	def __setattr__(self, name, value):
+		raise AttributeError("TicTacToeMove objects are immutable")
+	
+	# Returns the shared move object for the indicated player moving to the
+	# indicated square (arguments as for the constructor)
+	@classmethod
+	def of(cls, player, move):
+		return TicTacToeMove.MOVES[player][move]
 	
 	# Returns an informal string representation for printing
 	def __str__(self):
@@ -33,6 +71,11 @@ class TicTacToeMove(game_state.GameMove):
 	def is_forfeit(self):
 		return self.forfeit
 
+# The shared moves handed out by TicTacToeMove.of(), indexed by player, then
+# square
+TicTacToeMove.MOVES = [None] \
+		+ [[TicTacToeMove(p, i) for i in range(9)] for p in (1,2)]
+
 # Subclass of GameState representing a (past, current, future) state in
 #  a game of tic-tac-toe
 class TicTacToeState(game_state.GameState):
@@ -54,6 +97,7 @@ class TicTacToeState(game_state.GameState):
 	# Just clears the board and initializes it for playing
 	# Player X goes first
 	def __init__(self):
+		game_state.GameState.__init__(self)
 		self.clear()
 	
 	# Returns an informal string representation of the board
@@ -71,6 +115,76 @@ class TicTacToeState(game_state.GameState):
 	def clear(self):
 		self.board = [TicTacToeState.EMPTY for x in range(9)]
 		self.player = TicTacToeState.X;
+		self.zobrist = 0
+	
+	# Returns the 64-bit Zobrist key of this position (kept up to date by
+	# move() and unmove())
+	def hash_key(self):
+		return self.zobrist
+	
+	# Computes the Zobrist key of this position from scratch
+	def zobrist_hash(self):
+		h = ZOBRIST_O if self.player == TicTacToeState.O else 0
+		for i, x in enumerate(self.board):
+			if x != TicTacToeState.EMPTY:
+				h ^= ZOBRIST_SQUARES[i][x]
+		return h
+	
+	# The board looks the same turned or reflected, so there are 8 symmetries
+	# (see SYMMETRIES).  Returns the smallest of the 8 positions' hash keys and
+	# the symmetry giving it.
+	def canonical_key(self):
+		keys = [ZOBRIST_O if self.player == TicTacToeState.O else 0] * 8
+		for i, x in enumerate(self.board):
+			if x != TicTacToeState.EMPTY:
+				for s in range(8):
+					keys[s] ^= ZOBRIST_SQUARES[SYMMETRIES[s][i]][x]
+		key = min(keys)
+		return (key, keys.index(key))
+	
+	# Returns a copy of this state with the board turned or reflected by
+	# "symmetry" (see canonical_key())
+	def transformed(self, symmetry):
+		r = self.make_copy()
+		squares = SYMMETRIES[symmetry]
+		for i, x in enumerate(self.board):
+			r.board[squares[i]] = x
+		r.zobrist = r.zobrist_hash()
+		return r
+	
+	# Returns the move "move" becomes with the board turned or reflected by
+	# "symmetry": the same player, to the square its square goes to
+	def transform_move(self, move, symmetry):
+		return TicTacToeMove.of(move.get_player(), \
+				SYMMETRIES[symmetry][move.get_move()])
+	
+	# Returns the move which "move" is with the board turned or reflected by
+	# "symmetry"
+	def untransform_move(self, move, symmetry):
+		return TicTacToeMove.of(move.get_player(), \
+				INVERSE[symmetry][move.get_move()])
+	
+	# Returns the position as a string: the 9 squares, row by row, as 'X', 'O'
+	# or '-', then a space and the player to move (e.g. "X---O---- X")
+	def position_string(self):
+		return "%s %s" % ("".join([TicTacToeState.val_to_char(x) \
+				for x in self.board]).replace(' ', '-'), \
+			TicTacToeState.val_to_char(self.player))
+	
+	# Sets the board and player to move from a position string (see
+	# position_string())
+	def load_position(self, text):
+		chars = {'X': TicTacToeState.X, 'O': TicTacToeState.O, \
+					'-': TicTacToeState.EMPTY}
+		values = text.split()
+		if len(values) != 2 or len(values[0]) != 9 \
+				or values[1] not in ("X", "O") \
+				or [x for x in values[0] if x not in chars]:
+			raise ValueError("Not a valid tic-tac-toe position: %s" \
+				% repr(text))
+		self.board = [chars[x] for x in values[0]]
+		self.player = chars[values[1]]
+		self.zobrist = self.zobrist_hash()
 	
 	# returns a list of valid positions on the board
 	def board_positions(self):
@@ -91,6 +205,7 @@ class TicTacToeState(game_state.GameState):
 		game_state.GameState.copy_into(self, other)
 		other.player = self.player
 		other.board = [x for x in self.board]
+		other.zobrist = self.zobrist
 	
 	# Returns a TicTacToeState object, functionally identical to this one,
 	# which may be modified without modifying this state object's internals
@@ -133,6 +248,11 @@ class TicTacToeState(game_state.GameState):
 				return True
 		return False
 	
+	# Returns True if the player to move has any legal move (i.e., there's an
+	# empty square), False else
+	def has_legal_moves(self):
+		return TicTacToeState.EMPTY in self.board
+	
 	# Returns true if the indicated move is valid on this state
 	#
 	# "move" is a TicTacToeMove object
@@ -151,9 +271,31 @@ class TicTacToeState(game_state.GameState):
 		if not self.is_valid_move(move):
 			return None
 		self.board[move.get_move()] = move.get_player()
+		self.zobrist ^= ZOBRIST_SQUARES[move.get_move()][move.get_player()] \
+				^ ZOBRIST_O
 		self.player = (self.player % 2) + 1
 		return self.player
 	
+	# Performs the indicated move as move() does, but returns an undo record
+	# for unmove() instead of the next player (or None if the move was
+	# invalid).
+	#
+	# The record is just the square moved to; the square itself remembers who
+	# moved there.
+	#
+	# "move" is a TicTacToeMove object
+	def make_move(self, move):
+		if self.move(move) == None:
+			return None
+		return move.get_move()
+	
+	# Restores this state to how it was before the make_move() call which
+	# returned "record"
+	def unmove(self, record):
+		self.player = self.board[record]
+		self.board[record] = TicTacToeState.EMPTY
+		self.zobrist ^= ZOBRIST_SQUARES[record][self.player] ^ ZOBRIST_O
+	
 	# Returns a list of the valid moves which may be performed on this state,
 	# or None if the game controller refuses to allow any more expansions
 	# this turn.
@@ -166,8 +308,8 @@ class TicTacToeState(game_state.GameState):
 		moves = game_state.GameState.successor_moves(self)
 		if(moves == None):
 			return None
+		shared = TicTacToeMove.MOVES[self.player]
 		for i in range(9):
-			move = TicTacToeMove(self.player, i)
-			if(self.is_valid_move(move)):
-				moves.append(move)
+			if self.board[i] == TicTacToeState.EMPTY:
+				moves.append(shared[i])
 		return moves
\ No newline at end of file